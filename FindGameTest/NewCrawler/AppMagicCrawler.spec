@@ -6,7 +6,7 @@ a = Analysis(
     pathex=[],
     binaries=[],
     datas=[('config/urls.txt', 'config')],
-    hiddenimports=['pyautogui', 'pyperclip', 'pygetwindow'],
+    hiddenimports=['pyautogui', 'pyperclip', 'pygetwindow', 'websocket'],
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
@@ -0,0 +1,92 @@
+from datetime import datetime
+
+try:
+    import numpy as np
+    import pandas as pd
+except ImportError:  # pandas为可选依赖，没有安装时逐条解析(相同日期只解析一次)
+    np = None
+    pd = None
+
+# 游戏数少于这个数量时直接用Python处理，建DataFrame的开销比解析本身还大
+MIN_BATCH_SIZE = 2000
+
+
+def pandas_available():
+    return pd is not None
+
+
+def _parse_python(games, date_format, on_error):
+    """逐条解析日期，同一日期字符串只调用一次strptime"""
+    cache = {}
+    dates = []
+    for game in games:
+        value = game.get('release_date')
+        parsed = cache.get(value)
+        if parsed is None:
+            try:
+                parsed = cache[value] = datetime.strptime(game['release_date'], date_format)
+            except Exception as e:
+                if on_error:
+                    on_error(game, e)
+        dates.append(parsed)
+    return dates
+
+
+def _parse_pandas(games, date_format, on_error):
+    """按不同的日期字符串分组，每组只解析一次；pandas解析不了的交给strptime，保证接受的格式和报错信息一致"""
+    codes, uniques = pd.factorize(pd.Series([game.get('release_date') for game in games], dtype=object))
+    parsed = pd.to_datetime(pd.Series(uniques, dtype=object), format=date_format, errors='coerce')
+    unique_dates = list(parsed.dt.to_pydatetime())
+    invalid = parsed.isna().to_numpy()
+    for code in np.flatnonzero(invalid):
+        try:
+            unique_dates[code] = datetime.strptime(uniques[code], date_format)
+            invalid[code] = False
+        except Exception:
+            unique_dates[code] = None
+    dates = [unique_dates[code] if code >= 0 else None for code in codes]
+    # 解析失败(含缺少日期)的游戏按原顺序逐个报错
+    failed = (codes < 0) | invalid[np.maximum(codes, 0)]
+    for i in np.flatnonzero(failed):
+        _parse_python([games[i]], date_format, on_error)
+    return dates
+
+
+def _first_occurrences(games, indices):
+    seen = set()
+    unique = []
+    for i in indices:
+        key = (games[i].get('name'), games[i].get('release_date'))
+        if key not in seen:
+            seen.add(key)
+            unique.append(i)
+    return unique
+
+
+def dedup_games(games):
+    """同名同日期的游戏只保留第一个"""
+    return [games[i] for i in _first_occurrences(games, list(range(len(games))))]
+
+
+def filter_sort_dedup(games, cutoff_date, date_format='%Y-%m-%d', on_error=None, dedup=False, sort=True):
+    """保留发布日期晚于cutoff_date的游戏并设置parsed_date，按日期倒序稳定排序
+
+    dedup为True时同名同日期的游戏只保留第一个；结果与逐条strptime、list.sort(reverse=True)完全相同
+    """
+    if pd is not None and len(games) >= MIN_BATCH_SIZE:
+        dates = _parse_pandas(games, date_format, on_error)
+    else:
+        dates = _parse_python(games, date_format, on_error)
+
+    kept = [i for i, parsed in enumerate(dates) if parsed is not None and parsed > cutoff_date]
+    if dedup:
+        kept = _first_occurrences(games, kept)
+    if sort:
+        # 只对下标排序，不再比较字典；reverse=True时相同日期仍保持原顺序
+        kept.sort(key=dates.__getitem__, reverse=True)
+
+    result = []
+    for i in kept:
+        games[i]['parsed_date'] = dates[i]
+        result.append(games[i])
+    return result
@@ -0,0 +1,88 @@
+import argparse
+import contextlib
+import glob
+import io
+import os
+import random
+import shutil
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+from main import RESULT_DB_NAME, combine_html_files, generate_html_file
+from result_store import parse_html_report
+
+SAMPLE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'result')
+
+
+def make_report_games(count, seed=0):
+    """生成与结果文件中相同字段的游戏信息"""
+    rng = random.Random(seed)
+    start = datetime(2024, 1, 1)
+    return [{
+        'name': f'Game {seed}-{i}',
+        'url': f'https://appmagic.rocks/iphone/game-{i}/{6000000000 + i}',
+        'release_date': (start + timedelta(days=rng.randint(0, 500))).strftime('%Y-%m-%d'),
+        'countries': str(rng.randint(1, 150)),
+        'company_name': f'Publisher {i % 50}',
+        'source_url': f'https://appmagic.rocks/publisher/p{i % 50}/1_Publisher',
+    } for i in range(count)]
+
+
+def _run(func, *args, trace=False):
+    """返回耗时，trace为True时同时返回tracemalloc记录的内存峰值；被测函数的输出不打印"""
+    if trace:
+        tracemalloc.start()
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            func(*args)
+            elapsed = time.perf_counter() - start
+        return elapsed, tracemalloc.get_traced_memory()[1] if trace else 0
+    finally:
+        if trace:
+            tracemalloc.stop()
+
+
+def bench_combine(reports, games_per_report, samples):
+    """在临时目录中准备结果文件，分别测试首次合并(需要导入HTML)和再次合并(只查数据库)"""
+    sample_games = 0
+    for path in samples:
+        with open(path, 'r', encoding='utf-8') as f:
+            sample_games += len(parse_html_report(f.read()))
+    print(f"{'reports':>8}{'games':>9}{'first (s)':>11}{'again (s)':>11}{'games/s':>10}{'peak MB':>10}")
+    for count in reports:
+        with tempfile.TemporaryDirectory() as result_dir:
+            for path in samples:
+                shutil.copy(path, result_dir)
+            for i in range(count):
+                generate_html_file(make_report_games(games_per_report, seed=i),
+                                   os.path.join(result_dir, f'FindGame_2025-01-01_{i + 1}.html'))
+            total = count * games_per_report + sample_games
+            first, _ = _run(combine_html_files, result_dir, '2024.06.01')
+            again, _ = _run(combine_html_files, result_dir, '2024.06.01')
+            # tracemalloc会明显拖慢运行，删除数据库后单独再跑一次首次合并来取内存峰值
+            os.remove(os.path.join(result_dir, RESULT_DB_NAME))
+            _, peak = _run(combine_html_files, result_dir, '2024.06.01', trace=True)
+            print(f"{count + len(samples):>8}{total:>9}{first:>11.3f}{again:>11.3f}"
+                  f"{total / first if first else 0:>10.0f}{peak / 2 ** 20:>10.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='合并结果文件性能测试')
+    parser.add_argument('--reports', type=int, nargs='+', default=[10, 50, 100], help='生成的结果文件数量')
+    parser.add_argument('--games', type=int, default=200, help='每个结果文件中的游戏数量')
+    parser.add_argument('--samples', nargs='*', default=None,
+                        help='一起合并的已有结果文件(支持通配符)，默认使用result目录')
+    args = parser.parse_args()
+
+    patterns = args.samples if args.samples is not None else [os.path.join(SAMPLE_DIR, 'FindGame_*.html')]
+    samples = sorted(path for pattern in patterns for path in glob.glob(pattern)
+                     if not os.path.basename(path).startswith('FindGame_Combine_'))
+    print(f"已有结果文件: {len(samples)} 个")
+    bench_combine(args.reports, args.games, samples)
+
+
+if __name__ == '__main__':
+    main()
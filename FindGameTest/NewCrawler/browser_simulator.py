@@ -5,73 +5,112 @@ import pyperclip
 import pygetwindow as gw
 
 class BrowserSimulator:
-    def __init__(self, chrome_path=None):
+    def __init__(self, chrome_path=None, key_delay=0.15, poll_interval=0.5, devtools_delay=0.5):
         # 如果没有提供路径，使用默认路径
         self.chrome_path = chrome_path or r"C:\Program Files\Google\Chrome\Application\chrome.exe"
-        webbrowser.register('chrome', None, 
+        # 两次按键之间的间隔，只需保证Chrome来得及响应
+        self.key_delay = key_delay
+        # 两次检查页面内容之间的间隔
+        self.poll_interval = poll_interval
+        # 开发者工具停靠在页面窗口内时没有单独的窗口可以等待，按下F12后固定等待这么久
+        self.devtools_delay = devtools_delay
+        self.devtools_docked = None
+        webbrowser.register('chrome', None,
             webbrowser.BackgroundBrowser(self.chrome_path))
-    
-    def open_url(self, url, max_retries=5):
-        """打开URL并获取页面内容"""
-        # 启动Chrome
+
+    def _press(self, *keys):
+        """按下单个键或组合键，然后等待一个按键间隔"""
+        if len(keys) == 1:
+            pyautogui.press(keys[0])
+        else:
+            pyautogui.hotkey(*keys)
+        time.sleep(self.key_delay)
+
+    @staticmethod
+    def _window_titles(title):
+        return {window._hWnd: window.title for window in gw.getWindowsWithTitle(title)}
+
+    def _wait_for_window(self, title, before=None, timeout=10):
+        """轮询等待出现新的窗口，或已有窗口的标题改变(新标签页打开)；超时返回None
+
+        Chrome已经打开时窗口一直存在，只检查窗口是否存在会在新标签页获得焦点前就开始按键
+        """
+        before = before or {}
+        deadline = time.monotonic() + timeout
+        while True:
+            for window in gw.getWindowsWithTitle(title):
+                if before.get(window._hWnd) != window.title:
+                    return window
+            if time.monotonic() >= deadline:
+                return None
+            time.sleep(0.1)
+
+    def _open_devtools(self):
+        """按下F12，等到开发者工具窗口出现；开发者工具停靠在页面内时改为固定等待"""
+        before = self._window_titles('DevTools')
+        self._press('f12')
+        if self.devtools_docked:
+            time.sleep(self.devtools_delay)
+            return
+        # 没有等到单独的窗口说明开发者工具停靠在页面窗口内，之后不再等待窗口
+        self.devtools_docked = self._wait_for_window('DevTools', before, timeout=3) is None
+        if not self.devtools_docked:
+            # 窗口出现后还要等它获得焦点
+            time.sleep(self.key_delay)
+
+    def _copy_elements(self):
+        """通过开发者工具复制整个页面的元素"""
+        self._open_devtools()
+        self._press('ctrl', 'shift', 'p')
+        pyperclip.copy("显示元素")
+        self._press('ctrl', 'v')
+        self._press('enter')
+        self._press('home')
+        self._press('down')
+        self._press('f2')
+        self._press('ctrl', 'a')
+        self._press('ctrl', 'c')
+        return pyperclip.paste()
+
+    def open_url(self, url, max_retries=15):
+        """打开URL并获取页面内容，页面就绪后立即返回，max_retries决定最长等待时间"""
+        # 启动Chrome，等到新窗口或新标签页出现后再按键，否则会操作到原来的标签页
+        before = self._window_titles('Chrome')
         webbrowser.get('chrome').open('about:blank')
-        time.sleep(2)
-        
+
         # 找到并激活Chrome窗口
-        chrome_window = gw.getWindowsWithTitle('Chrome')[0]
+        chrome_window = self._wait_for_window('Chrome', before)
+        if chrome_window is None:
+            raise Exception("未找到Chrome窗口")
         chrome_window.activate()
-        
+
         # 访问URL
-        pyautogui.hotkey('ctrl', 'l')  # 选中地址栏
-        time.sleep(0.5)
+        self._press('ctrl', 'l')  # 选中地址栏
         pyperclip.copy(url)  # 复制URL到剪贴板
-        pyautogui.hotkey('ctrl', 'v')  # 粘贴URL
-        time.sleep(0.5)
+        self._press('ctrl', 'v')  # 粘贴URL
         pyautogui.press('enter')  # 访问URL
-        
+
         # 循环检查页面是否加载完成
         for attempt in range(max_retries):
-            time.sleep(1)  # 等待基本加载时间
-            
-            # 获取页面内容
-            pyautogui.press('f12')
-            time.sleep(0.5)
-            pyautogui.hotkey('ctrl', 'shift', 'p')
-            time.sleep(0.5)
-            pyperclip.copy("显示元素")
-            pyautogui.hotkey('ctrl', 'v')
-            time.sleep(0.5)
-            pyautogui.press('enter')
-            time.sleep(0.5)
-            pyautogui.press('home')
-            time.sleep(0.5)
-            pyautogui.press('down')
-            time.sleep(0.5)
-            pyautogui.press('f2')
-            time.sleep(0.5)
-            pyautogui.hotkey('ctrl', 'a')
-            time.sleep(0.5)
-            pyautogui.hotkey('ctrl', 'c')
-            time.sleep(0.5)
-            
+            time.sleep(self.poll_interval)  # 等待基本加载时间
+
             # 检查内容
-            content = pyperclip.paste()
+            content = self._copy_elements()
             if 'publisher-name' in content and 'publisher-app-row' in content:
                 print(f"页面加载完成，尝试次数: {attempt + 1}")
                 pyautogui.press('f12')  # 关闭开发者工具
                 return content
-                
+
             print(f"页面未完全加载，重试中... ({attempt + 1}/{max_retries})")
             pyautogui.press('f12')  # 关闭开发者工具
-            time.sleep(1)
-        
+
         raise Exception(f"页面加载失败，已重试 {max_retries} 次")
 
 if __name__ == "__main__":
     browser = BrowserSimulator()
     content = browser.open_url("https://www.baidu.com")
     print("获取到的内容长度:", len(content))
-    
+
     with open('baidu.html', 'w', encoding='utf-8') as f:
         f.write(content)
-    print("内容已保存到 baidu.html") 
\ No newline at end of file
+    print("内容已保存到 baidu.html")
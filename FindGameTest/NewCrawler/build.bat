@@ -16,7 +16,7 @@ REM 激活虚拟环境
 call venv\Scripts\activate
 
 REM 安装依赖项
-pip install pyinstaller pyautogui pyperclip pygetwindow beautifulsoup4
+pip install pyinstaller pyautogui pyperclip pygetwindow beautifulsoup4 lxml requests websocket-client
 
 REM 进入脚本文件所在目录
 cd /d %CURRENT_DIR%
@@ -28,6 +28,7 @@ pyinstaller --onefile --name "AppMagicCrawler" ^
     --hidden-import pyautogui ^
     --hidden-import pyperclip ^
     --hidden-import pygetwindow ^
+    --hidden-import websocket ^
     main.py
 
 REM 检查是否成功生成EXE文件
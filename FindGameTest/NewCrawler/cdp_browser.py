@@ -0,0 +1,186 @@
+import itertools
+import json
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import requests
+import websocket
+
+# 返回公司名称是否出现、游戏行数量
+READY_SCRIPT = '''
+JSON.stringify({
+    name: !!document.querySelector('.publisher-name'),
+    rows: document.querySelectorAll('publisher-app-row').length
+})
+'''
+
+
+class CdpTab:
+    """一个标签页的DevTools连接"""
+
+    def __init__(self, target, timeout=30):
+        self.id = target['id']
+        self.ws = websocket.create_connection(target['webSocketDebuggerUrl'], timeout=timeout, suppress_origin=True)
+        self._ids = itertools.count(1)
+
+    def send(self, method, params=None):
+        """发送命令并等待对应的返回，期间收到的事件直接忽略"""
+        message_id = next(self._ids)
+        self.ws.send(json.dumps({'id': message_id, 'method': method, 'params': params or {}}))
+        while True:
+            message = json.loads(self.ws.recv())
+            if message.get('id') != message_id:
+                continue
+            if 'error' in message:
+                raise Exception(f"{method} 失败: {message['error']}")
+            return message.get('result', {})
+
+    def evaluate(self, expression):
+        result = self.send('Runtime.evaluate', {'expression': expression, 'returnByValue': True})
+        return result.get('result', {}).get('value')
+
+    def close(self):
+        try:
+            self.ws.close()
+        except Exception:
+            pass
+
+
+class CdpBrowser:
+    """通过DevTools协议读取页面，接口与 BrowserSimulator 兼容，不需要操作桌面窗口"""
+
+    def __init__(self, chrome_path=None, user_data_dir=None, port=9222, headless=False,
+                 max_tabs=4, timeout=30, settle=0.5, empty_grace=5.0):
+        self.chrome_path = chrome_path or r"C:\Program Files\Google\Chrome\Application\chrome.exe"
+        # 使用用户自己的Chrome配置目录时可以沿用登录状态；不指定时用临时目录，
+        # 否则已经打开的Chrome会接管新进程而不打开调试端口，Chrome 136 起也不允许默认配置开启远程调试
+        self.user_data_dir = user_data_dir
+        self._temp_dir = None
+        self.port = port
+        self.headless = headless
+        self.max_tabs = max_tabs
+        self.timeout = timeout
+        self.settle = settle
+        # 只有公司名称没有游戏行超过这个时间视为空公司，不当作加载失败
+        self.empty_grace = empty_grace
+        self.base_url = f'http://127.0.0.1:{port}'
+        self.process = None
+        self._lock = threading.Lock()
+
+    def _is_running(self):
+        try:
+            return requests.get(f'{self.base_url}/json/version', timeout=1).ok
+        except requests.RequestException:
+            return False
+
+    def start(self):
+        """启动Chrome并打开调试端口；端口上已有Chrome时直接连接"""
+        with self._lock:
+            if self._is_running():
+                return
+            args = [
+                self.chrome_path,
+                f'--remote-debugging-port={self.port}',
+                # 只允许本机调试地址连接，其他网页不能控制这个浏览器
+                f'--remote-allow-origins={self.base_url}',
+                '--no-first-run',
+                '--no-default-browser-check',
+            ]
+            if self.user_data_dir:
+                user_data_dir = os.path.expandvars(self.user_data_dir)
+            else:
+                user_data_dir = self._temp_dir = tempfile.mkdtemp(prefix='appmagic-cdp-')
+            args.append(f'--user-data-dir={user_data_dir}')
+            if self.headless:
+                args.append('--headless=new')
+            self.process = subprocess.Popen(args, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            deadline = time.monotonic() + 20
+            while not self._is_running():
+                if time.monotonic() >= deadline:
+                    raise Exception(f"Chrome调试端口 {self.port} 无法连接")
+                time.sleep(0.2)
+
+    def _new_tab(self):
+        response = requests.put(f'{self.base_url}/json/new?about:blank', timeout=10)
+        response.raise_for_status()
+        return CdpTab(response.json(), self.timeout)
+
+    def _close_tab(self, tab):
+        tab.close()
+        try:
+            requests.get(f'{self.base_url}/json/close/{tab.id}', timeout=5)
+        except requests.RequestException:
+            pass
+
+    def _wait_ready(self, tab):
+        """游戏行出现且数量不再变化后返回True；公司没有游戏时，名称出现 empty_grace 秒后也返回True"""
+        deadline = time.monotonic() + self.timeout
+        last_rows, stable_since = -1, time.monotonic()
+        name_since = None
+        while time.monotonic() < deadline:
+            state = json.loads(tab.evaluate(READY_SCRIPT) or '{}')
+            rows = state.get('rows', 0)
+            now = time.monotonic()
+            if state.get('name') and rows == 0:
+                if name_since is None:
+                    name_since = now
+                elif now - name_since >= self.empty_grace:
+                    print('公司没有游戏')
+                    return True
+            else:
+                name_since = None
+            if rows != last_rows:
+                last_rows, stable_since = rows, now
+            elif state.get('name') and rows > 0 and now - stable_since >= self.settle:
+                return True
+            time.sleep(0.1)
+        return False
+
+    def open_url(self, url, max_retries=None):
+        """打开URL并获取页面内容"""
+        self.start()
+        tab = self._new_tab()
+        try:
+            start = time.monotonic()
+            tab.send('Page.navigate', {'url': url})
+            if not self._wait_ready(tab):
+                raise Exception(f"页面加载失败，已等待 {self.timeout} 秒")
+            content = tab.evaluate('document.documentElement.outerHTML')
+            print(f"页面加载完成，用时 {time.monotonic() - start:.1f}s")
+            return content
+        finally:
+            self._close_tab(tab)
+
+    def open_urls(self, urls):
+        """最多同时打开 max_tabs 个标签页，哪个页面先加载完就先返回 (序号, 网址, 页面内容或异常)"""
+        self.start()
+
+        def fetch(index, url):
+            print(f'正在处理: {url}')
+            try:
+                return index, url, self.open_url(url)
+            except Exception as e:
+                return index, url, e
+
+        with ThreadPoolExecutor(max_workers=self.max_tabs) as executor:
+            futures = [executor.submit(fetch, index, url) for index, url in enumerate(urls)]
+            for future in as_completed(futures):
+                yield future.result()
+
+    def close(self):
+        """关闭由本对象启动的Chrome，删除临时配置目录"""
+        if self.process is not None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+            self.process = None
+        if self._temp_dir is not None:
+            shutil.rmtree(self._temp_dir, ignore_errors=True)
+            self._temp_dir = None
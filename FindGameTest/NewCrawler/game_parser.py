@@ -0,0 +1,87 @@
+try:
+    from lxml import etree
+    from lxml import html as lxml_html
+    from lxml.etree import ParserError
+except ImportError:  # lxml为可选依赖，没有安装时使用BeautifulSoup
+    etree = None
+    lxml_html = None
+    ParserError = None
+
+BASE_URL = 'https://appmagic.rocks'
+COUNTRIES_EVENT = 'publisher_page_show_countries_tooltip'
+
+if etree is not None:
+    # 与 soup.select('publisher-app-row[class*="g-item"][class*="parent-app-info-hover"]') 等价
+    _find_rows = etree.XPath(
+        '//publisher-app-row[contains(@class, "g-item") and contains(@class, "parent-app-info-hover")]'
+    )
+    _find_company = etree.XPath(
+        '(//div[contains(concat(" ", normalize-space(@class), " "), " publisher-name ")])[1]'
+    )
+
+
+def lxml_available() -> bool:
+    return etree is not None
+
+
+def _has_class(element, name: str) -> bool:
+    return name in (element.get('class') or '').split()
+
+
+def _text(element) -> str:
+    return element.text_content().strip()
+
+
+def _release_date_tag(app_release_date):
+    """等价于 row.find('app-release-date').find('span', class_='release-date').find('span')"""
+    release_date = next((e for e in app_release_date.iter('span') if _has_class(e, 'release-date')), None)
+    if release_date is None:
+        return None
+    return next(release_date.iterdescendants('span'), None)
+
+
+def extract_game_info(row, source_url: str, company_name: str) -> dict:
+    """单次遍历游戏行，取出所有字段，结果与BeautifulSoup版本一致"""
+    name_tag = app_release_date = countries_tag = None
+    for element in row.iter():
+        tag = element.tag
+        if tag == 'a':
+            if name_tag is None and _has_class(element, 'g-app-name'):
+                name_tag = element
+        elif tag == 'app-release-date':
+            if app_release_date is None:
+                app_release_date = element
+        elif tag == 'span':
+            if countries_tag is None and element.get('analyticsevent') == COUNTRIES_EVENT:
+                countries_tag = element
+        if name_tag is not None and app_release_date is not None and countries_tag is not None:
+            break
+
+    date_tag = _release_date_tag(app_release_date) if app_release_date is not None else None
+    href = name_tag.get('href', 'N/A') if name_tag is not None else 'N/A'
+    return {
+        'name': _text(name_tag) if name_tag is not None else 'N/A',
+        'url': BASE_URL + href if href.startswith('/') else href,
+        'release_date': _text(date_tag) if date_tag is not None else 'N/A',
+        'countries': _text(countries_tag) if countries_tag is not None else 'N/A',
+        'company_name': company_name,
+        'source_url': source_url,
+    }
+
+
+def extract_all_game_info(html: str, source_url: str) -> list:
+    """使用lxml和预编译的XPath提取所有游戏的信息"""
+    try:
+        root = lxml_html.document_fromstring(html)
+    except ParserError:
+        # 只有空白或注释的页面lxml会报错，BeautifulSoup返回空列表，这里保持一致
+        print("Found 0 game rows")
+        return []
+
+    company = _find_company(root)
+    company_name = _text(company[0]) if company else 'N/A'
+
+    game_rows = _find_rows(root)
+    print(f"Found {len(game_rows)} game rows")
+
+    return [extract_game_info(row, source_url, company_name) for row in game_rows]
@@ -1,17 +1,37 @@
 import os
-import time
 import re
 from bs4 import BeautifulSoup
-from browser_simulator import BrowserSimulator
+import game_parser
+from result_store import ResultStore
+from pacer import AdaptivePacer, is_blocked
+from retry_queue import RetryQueue, load_dead_letters, save_dead_letters
+from exporters import EXPORT_FORMATS, export_games
+from batch_engine import filter_sort_dedup
 from datetime import datetime
 import sys
-import pygetwindow as gw
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+try:
+    import pygetwindow as gw
+except Exception:  # Linux等没有桌面窗口管理的环境，只能使用cdp方式
+    gw = None
+
+RESULT_DB_NAME = 'findgame.db'
+DEAD_LETTER_NAME = 'dead_letter.txt'
 
 def read_config():
     """读取配置文件"""
     config = {
         'chrome_path': '',
         'start_date': '',
+        'parser': 'bs4',
+        'backend': 'simulator',
+        'user_data_dir': '',
+        'headless': False,
+        'tabs': 4,
+        'retries': 2,
+        'export': [],
         'urls': []
     }
     
@@ -36,6 +56,25 @@ def read_config():
                 config['chrome_path'] = line.split('=', 1)[1].strip()
             elif line.startswith('start_date='):
                 config['start_date'] = line.split('=', 1)[1].strip()
+            elif line.startswith('parser='):
+                # bs4 或 lxml，lxml解析更快，结果相同
+                config['parser'] = line.split('=', 1)[1].strip()
+            elif line.startswith('backend='):
+                # simulator: 模拟键盘操作开发者工具；cdp: 通过调试端口直接读取页面
+                config['backend'] = line.split('=', 1)[1].strip()
+            elif line.startswith('user_data_dir='):
+                config['user_data_dir'] = line.split('=', 1)[1].strip()
+            elif line.startswith('headless='):
+                config['headless'] = line.split('=', 1)[1].strip().lower() in ('1', 'true', 'yes')
+            elif line.startswith('tabs='):
+                config['tabs'] = int(line.split('=', 1)[1].strip())
+            elif line.startswith('retries='):
+                # 失败的网址放到最后重试的次数
+                config['retries'] = int(line.split('=', 1)[1].strip())
+            elif line.startswith('export='):
+                # 同时导出的格式，逗号分隔：jsonl,csv,parquet
+                formats = [f.strip() for f in line.split('=', 1)[1].split(',')]
+                config['export'] = [f for f in formats if f in EXPORT_FORMATS]
             else:
                 # 清理URL并添加到列表
                 url = line.strip()
@@ -58,7 +97,9 @@ def extract_game_info(row, source_url, company_name):
         game_info['url'] = 'https://appmagic.rocks' + game_name_tag['href']
 
     # 提取上线日期
-    release_date_tag = row.find('app-release-date').find('span', class_='release-date').find('span') if row.find('app-release-date') else None
+    app_release_date_tag = row.find('app-release-date')
+    release_date_span = app_release_date_tag.find('span', class_='release-date') if app_release_date_tag else None
+    release_date_tag = release_date_span.find('span') if release_date_span else None
     game_info['release_date'] = release_date_tag.text.strip() if release_date_tag else 'N/A'
 
     # 提取发布国家数
@@ -73,8 +114,11 @@ def extract_game_info(row, source_url, company_name):
 
     return game_info
 
-def extract_all_game_info(html, source_url):
+def extract_all_game_info(html, source_url, backend='bs4'):
     """提取所有游戏的信息"""
+    if backend == 'lxml' and game_parser.lxml_available():
+        return game_parser.extract_all_game_info(html, source_url)
+
     soup = BeautifulSoup(html, 'html.parser')
 
     # 提取公司名称
@@ -93,28 +137,100 @@ def extract_all_game_info(html, source_url):
 
     return games
 
-def filter_and_sort_games(games, cutoff_date):
-    """过滤和排序游戏信息"""
-    filtered_games = []
-    cutoff_date = datetime.strptime(cutoff_date, '%Y.%m.%d')
+def create_browser(config):
+    """根据配置创建浏览器"""
+    if config['backend'] == 'cdp':
+        from cdp_browser import CdpBrowser
+        return CdpBrowser(
+            chrome_path=config['chrome_path'],
+            user_data_dir=config['user_data_dir'] or None,
+            headless=config['headless'],
+            max_tabs=config['tabs'],
+        )
+    from browser_simulator import BrowserSimulator
+    return BrowserSimulator(chrome_path=config['chrome_path'])
+
+def iter_pages(browser, urls, tasks=None):
+    """依次返回 (序号, 网址, 页面内容或异常)
 
-    for game in games:
+    出错或被拦截的网址交给 tasks 延迟重试，不在原地等待；重试次数用完后才返回失败的结果
+    """
+    if tasks is None:
+        tasks = RetryQueue(urls, max_retries=0)
+    if hasattr(browser, 'open_urls'):
+        # 支持多标签页的浏览器同时加载多个网址，失败的网址在这一批完成后再重试
+        while True:
+            batch = tasks.get_all()
+            if not batch:
+                return
+            for i, url, content in browser.open_urls([url for _, url, _ in batch]):
+                if is_blocked(content) and tasks.retry(batch[i], content):
+                    continue
+                yield batch[i][0], url, content
+        return
+    # 两个网址之间的等待时间随页面是否正常自动调整
+    pacer = AdaptivePacer()
+    first = True
+    while True:
+        task = tasks.get()
+        if task is None:
+            return
+        if not first:
+            pacer.wait()
+        first = False
+        index, url, _ = task
+        print(f'正在处理: {url}')
         try:
-            # 跳过无效的日期
-            if game['release_date'] == 'N/A' or not game['release_date']:
-                continue
-                
-            release_date = datetime.strptime(game['release_date'], '%Y-%m-%d')
-            if release_date > cutoff_date:
-                game['parsed_date'] = release_date
-                filtered_games.append(game)
+            content = browser.open_url(url)
         except Exception as e:
-            print(f"Error parsing date for game {game['name']}: {e}")
+            content = e
+        pacer.record(content)
+        if is_blocked(content) and tasks.retry(task, content):
             continue
+        yield index, url, content
+        del content
+
+def crawl_and_parse(browser, config, parse_workers=2, tasks=None):
+    """浏览器加载下一个网址的同时，由子进程解析已经取得的页面"""
+    results = {}
+    pending = deque()
 
-    # 按日期倒序排序
-    filtered_games.sort(key=lambda x: x['parsed_date'], reverse=True)
-    return filtered_games
+    def collect(index, url, future):
+        try:
+            results[index] = future.result()
+        except Exception as e:
+            print(f'解析 {url} 时出错: {str(e)}')
+
+    with ProcessPoolExecutor(max_workers=parse_workers) as executor:
+        for index, url, content in iter_pages(browser, config['urls'], tasks):
+            if isinstance(content, Exception):
+                print(f'处理 {url} 时出错: {str(content)}')
+                continue
+            # 等待中的页面过多时先取回最早的结果，避免内存中积压页面
+            while len(pending) >= parse_workers * 2:
+                collect(*pending.popleft())
+            pending.append((index, url, executor.submit(extract_all_game_info, content, url, config['parser'])))
+            del content
+        while pending:
+            collect(*pending.popleft())
+
+    games = []
+    for index in sorted(results):
+        games.extend(results[index])
+    return games
+
+def filter_and_sort_games(games, cutoff_date):
+    """过滤和排序游戏信息"""
+    cutoff_date = datetime.strptime(cutoff_date, '%Y.%m.%d')
+
+    def on_error(game, e):
+        # 跳过无效的日期
+        if game.get('release_date') in ('N/A', '', None):
+            return
+        print(f"Error parsing date for game {game['name']}: {e}")
+
+    # 批量解析日期并按日期倒序排序，安装了pandas时按不同日期分组一次解析
+    return filter_sort_dedup(games, cutoff_date, '%Y-%m-%d', on_error=on_error)
 
 def generate_html_file(games, output_file):
     """生成新的HTML文件"""
@@ -154,64 +270,27 @@ def get_next_file_index(result_dir, date_str):
     # 返回最大索引+1
     return max(indices) + 1 if indices else 1
 
-def combine_html_files(result_dir, start_date):
-    """合并HTML文件并按开始日期筛选"""
-    all_games = {}  # 使用字典来存储游戏，以游戏名和发布日期作为键
-    
-    # 遍历所有HTML文件
-    for file in os.listdir(result_dir):
-        if file.startswith('FindGame_') and file.endswith('.html'):
-            file_path = os.path.join(result_dir, file)
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-                
-            # 使用BeautifulSoup解析HTML
-            soup = BeautifulSoup(content, 'html.parser')
-            
-            # 提取表格行
-            rows = soup.select('table tr')[1:]  # 跳过表头
-            for row in rows:
-                cols = row.find_all('td')
-                if len(cols) >= 4:
-                    game_info = {
-                        'name': cols[0].text.strip(),
-                        'url': cols[0].find('a')['href'] if cols[0].find('a') else '',
-                        'release_date': cols[1].text.strip(),
-                        'countries': cols[2].text.strip(),
-                        'company_name': cols[3].text.strip(),
-                        'source_url': cols[3].find('a')['href'] if cols[3].find('a') else ''
-                    }
-                    # 使用游戏名和发布日期组合作为唯一标识
-                    game_key = f"{game_info['name']}_{game_info['release_date']}"
-                    all_games[game_key] = game_info
-    
-    # 过滤和排序
-    filtered_games = []
-    start_date = datetime.strptime(start_date, '%Y.%m.%d')
-    
-    # 处理去重后的游戏列表
-    for game in all_games.values():
-        try:
-            release_date = datetime.strptime(game['release_date'], '%Y-%m-%d')
-            if release_date >= start_date:
-                game['parsed_date'] = release_date
-                filtered_games.append(game)
-        except Exception as e:
-            print(f"Error parsing date for game {game['name']}: {e}")
-            continue
-    
-    # 按日期倒序排序
-    filtered_games.sort(key=lambda x: x['parsed_date'], reverse=True)
-    
-    # 生成合并后的文件
-    output_file = os.path.join(result_dir, f'FindGame_Combine_{start_date.strftime("%Y.%m.%d")}.html')
-    generate_html_file(filtered_games, output_file)
-    
+def combine_html_files(result_dir, start_date, export_formats=()):
+    """合并历史数据并按开始日期筛选"""
+    with ResultStore(os.path.join(result_dir, RESULT_DB_NAME)) as store:
+        # 只有还没导入过的HTML结果文件才需要解析
+        store.import_html_reports(result_dir)
+
+        start_date = datetime.strptime(start_date, '%Y.%m.%d')
+        filtered_games = store.query_since(start_date)
+        total = store.count()
+
+        # 生成合并后的文件
+        output_file = os.path.join(result_dir, f'FindGame_Combine_{start_date.strftime("%Y.%m.%d")}.html')
+        generate_html_file(filtered_games, output_file)
+        store.mark_imported(os.path.basename(output_file))
+        export_games(filtered_games, output_file, export_formats)
+
     # 打印统计信息
     print(f"\n统计信息:")
-    print(f"总游戏数: {len(all_games)}")
+    print(f"总游戏数: {total}")
     print(f"筛选后游戏数: {len(filtered_games)}")
-    
+
     return output_file
 
 def open_html_file(file_path):
@@ -228,7 +307,7 @@ def main():
         current_window = None
         try:
             # 尝试获取命令行窗口（可能是"AppMagicCrawler"或"Python"）
-            current_window = gw.getWindowsWithTitle('AppMagicCrawler')[0]
+            current_window = gw.getWindowsWithTitle('AppMagicCrawler')[0] if gw else None
         except IndexError:
             try:
                 current_window = gw.getWindowsWithTitle('Python')[0]
@@ -249,25 +328,30 @@ def main():
         if choice == "1":
             # 原有的抓取逻辑
             config = read_config()
-            browser = BrowserSimulator(chrome_path=config['chrome_path'])
-            
-            games = []
-            for url in config['urls']:
-                try:
-                    print(f'正在处理: {url}')
-                    content = browser.open_url(url)
-                    game_info_list = extract_all_game_info(content, url)
-                    games.extend(game_info_list)
-                    time.sleep(2)
-                except Exception as e:
-                    print(f'处理 {url} 时出错: {str(e)}')
-                    continue
-            
-            filtered_games = filter_and_sort_games(games, config['start_date'])
-            
             result_dir = os.path.join(base_path, 'result')
             if not os.path.exists(result_dir):
                 os.makedirs(result_dir)
+
+            # 上次重试后仍失败的网址这次最先抓取
+            dead_letter_file = os.path.join(result_dir, DEAD_LETTER_NAME)
+            reseed = load_dead_letters(dead_letter_file)
+            if reseed:
+                print(f'重新抓取上次失败的 {len(reseed)} 个网址')
+                config['urls'].extend(url for url in reseed if url not in config['urls'])
+
+            browser = create_browser(config)
+            tasks = RetryQueue(config['urls'], max_retries=config['retries'])
+            tasks.prioritize(reseed)
+            try:
+                games = crawl_and_parse(browser, config, tasks=tasks)
+            finally:
+                if hasattr(browser, 'close'):
+                    browser.close()
+            save_dead_letters(dead_letter_file, tasks.dead)
+            if tasks.dead:
+                print(f'{len(tasks.dead)} 个网址重试后仍失败，已记录到 {dead_letter_file}，下次抓取时排在最前面')
+            
+            filtered_games = filter_and_sort_games(games, config['start_date'])
             
             current_date = datetime.now().strftime('%Y-%m-%d')
             next_index = get_next_file_index(result_dir, current_date)
@@ -275,6 +359,12 @@ def main():
             
             generate_html_file(filtered_games, output_file)
             print(f'已生成分析结果: {output_file}')
+            export_games(filtered_games, output_file, config['export'])
+
+            # 同时写入结果数据库，合并历史数据时直接查询
+            with ResultStore(os.path.join(result_dir, RESULT_DB_NAME)) as store:
+                store.save_games(filtered_games)
+                store.mark_imported(os.path.basename(output_file))
             
             # 打开结果文件
             open_html_file(output_file)
@@ -293,7 +383,7 @@ def main():
                 if not os.path.exists(result_dir):
                     raise Exception("没有找到历史数据文件夹")
                 
-                output_file = combine_html_files(result_dir, date_str)
+                output_file = combine_html_files(result_dir, date_str, read_config()['export'])
                 print(f'已生成合并结果: {output_file}')
                 
                 # 打开结果文件
@@ -324,4 +414,5 @@ def main():
             input()
 
 if __name__ == '__main__':
+    multiprocessing.freeze_support()
     main() 
\ No newline at end of file
@@ -0,0 +1,45 @@
+import random
+import time
+
+# 验证码、限流、拒绝访问页面中常见的文字
+BLOCK_MARKERS = (
+    'captcha', 'cf-challenge', 'challenge-platform', 'are you a robot', 'verify you are human',
+    'too many requests', 'rate limit', 'access denied', 'error 429',
+)
+
+
+def is_blocked(content):
+    """页面没有游戏行且出现验证码/限流文字，或连公司名称都没有时视为被拦截"""
+    if not content or isinstance(content, Exception):
+        return True
+    if 'publisher-app-row' in content:
+        return False
+    lowered = content.lower()
+    return any(marker in lowered for marker in BLOCK_MARKERS) or 'publisher-name' not in content
+
+
+class AdaptivePacer:
+    """根据页面结果调整两个网址之间的等待时间
+
+    页面正常时每次把间隔缩短为0.8倍，直到 min_delay；
+    出错或被拦截时间隔翻倍，直到 max_delay；实际等待时间带随机抖动
+    """
+
+    def __init__(self, delay=2.0, min_delay=0.5, max_delay=120.0):
+        self.delay = delay
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.failures = 0
+
+    def record(self, content):
+        """记录一个页面的结果，content为页面内容或异常"""
+        if is_blocked(content):
+            self.failures += 1
+            self.delay = min(self.max_delay, self.delay * 2)
+            print(f'页面异常，下一个网址前等待约 {self.delay:.1f} 秒')
+        else:
+            self.failures = 0
+            self.delay = max(self.min_delay, self.delay * 0.8)
+
+    def wait(self):
+        time.sleep(self.delay / 2 + random.uniform(0, self.delay / 2))
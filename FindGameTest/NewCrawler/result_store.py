@@ -0,0 +1,125 @@
+import os
+import sqlite3
+from datetime import datetime
+
+from bs4 import BeautifulSoup
+
+FIELDS = ('name', 'url', 'release_date', 'countries', 'company_name', 'source_url')
+
+
+class ResultStore:
+    """用SQLite保存抓取结果，以(游戏名, 发布日期)去重，按发布日期建索引"""
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self.conn = sqlite3.connect(db_path)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.executescript('''
+            CREATE TABLE IF NOT EXISTS games (
+                name TEXT NOT NULL,
+                url TEXT,
+                release_date TEXT NOT NULL,
+                countries TEXT,
+                company_name TEXT,
+                source_url TEXT,
+                updated_at TEXT,
+                UNIQUE (name, release_date)
+            );
+            CREATE INDEX IF NOT EXISTS idx_games_release_date ON games (release_date);
+            CREATE TABLE IF NOT EXISTS imported_files (
+                file_name TEXT PRIMARY KEY,
+                imported_at TEXT
+            );
+        ''')
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def save_games(self, games):
+        """保存游戏信息，同名同日期的游戏以最新一次为准；返回保存的数量"""
+        now = datetime.now().isoformat(timespec='seconds')
+        rows = []
+        for game in games:
+            try:
+                # 只保存日期有效的游戏，保证按日期字符串比较和排序是正确的
+                datetime.strptime(game['release_date'], '%Y-%m-%d')
+            except (KeyError, TypeError, ValueError):
+                print(f"Error parsing date for game {game.get('name')}: {game.get('release_date')}")
+                continue
+            rows.append(tuple(game.get(field, '') for field in FIELDS) + (now,))
+        with self.conn:
+            self.conn.executemany('''
+                INSERT INTO games (name, url, release_date, countries, company_name, source_url, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (name, release_date) DO UPDATE SET
+                    url = excluded.url,
+                    countries = excluded.countries,
+                    company_name = excluded.company_name,
+                    source_url = excluded.source_url,
+                    updated_at = excluded.updated_at
+            ''', rows)
+        return len(rows)
+
+    def mark_imported(self, file_name):
+        """记录已经写入数据库的结果文件，之后不再重复导入"""
+        with self.conn:
+            self.conn.execute(
+                'INSERT OR REPLACE INTO imported_files (file_name, imported_at) VALUES (?, ?)',
+                (file_name, datetime.now().isoformat(timespec='seconds')),
+            )
+
+    def import_html_reports(self, result_dir):
+        """把以前生成的HTML结果文件导入数据库，每个文件只导入一次"""
+        imported = {row['file_name'] for row in self.conn.execute('SELECT file_name FROM imported_files')}
+        count = 0
+        for file in sorted(os.listdir(result_dir)):
+            if not (file.startswith('FindGame_') and file.endswith('.html')) or file in imported:
+                continue
+            with open(os.path.join(result_dir, file), 'r', encoding='utf-8') as f:
+                games = parse_html_report(f.read())
+            self.save_games(games)
+            self.mark_imported(file)
+            count += 1
+        if count:
+            print(f"已导入 {count} 个历史结果文件")
+        return count
+
+    def query_since(self, start_date):
+        """查询发布日期不早于start_date的游戏，按日期倒序"""
+        rows = self.conn.execute(
+            'SELECT * FROM games WHERE release_date >= ? ORDER BY release_date DESC, rowid',
+            (start_date.strftime('%Y-%m-%d'),),
+        )
+        games = []
+        for row in rows:
+            game = {field: row[field] for field in FIELDS}
+            game['parsed_date'] = datetime.strptime(row['release_date'], '%Y-%m-%d')
+            games.append(game)
+        return games
+
+    def count(self):
+        return self.conn.execute('SELECT COUNT(*) FROM games').fetchone()[0]
+
+
+def parse_html_report(content):
+    """从生成的HTML结果文件中读取游戏信息"""
+    soup = BeautifulSoup(content, 'html.parser')
+    games = []
+    for row in soup.select('table tr')[1:]:  # 跳过表头
+        cols = row.find_all('td')
+        if len(cols) >= 4:
+            games.append({
+                'name': cols[0].text.strip(),
+                'url': cols[0].find('a')['href'] if cols[0].find('a') else '',
+                'release_date': cols[1].text.strip(),
+                'countries': cols[2].text.strip(),
+                'company_name': cols[3].text.strip(),
+                'source_url': cols[3].find('a')['href'] if cols[3].find('a') else ''
+            })
+    return games
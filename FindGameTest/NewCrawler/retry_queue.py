@@ -0,0 +1,91 @@
+import heapq
+import os
+import random
+import time
+from collections import deque
+from datetime import datetime
+
+
+class RetryQueue:
+    """依次取出 (序号, 网址, 已重试次数)
+
+    失败的网址按指数退避延迟后重新排队，到时间后优先于新网址取出，不在原地反复重试；
+    重试次数用完的网址放入 dead
+    """
+
+    def __init__(self, urls, max_retries=2, base_delay=30, max_delay=300):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.fresh = deque((index, url, 0) for index, url in enumerate(urls))
+        # (可重试时间, 序号, 任务)
+        self.delayed = []
+        self.seq = 0
+        self.dead = []
+
+    def prioritize(self, urls):
+        """这些网址排到最前面先抓取，序号不变，结果仍按原来的顺序合并"""
+        first = set(urls)
+        self.fresh = deque([task for task in self.fresh if task[1] in first] +
+                           [task for task in self.fresh if task[1] not in first])
+
+    def _wait_for_retry(self):
+        """只剩等待重试的网址时，睡到最早的一个可以重试"""
+        if not self.fresh and self.delayed:
+            delay = self.delayed[0][0] - time.monotonic()
+            if delay > 0:
+                print(f'等待 {delay:.0f} 秒后重试失败的网址')
+                time.sleep(delay)
+
+    def get(self):
+        """取出下一个网址，全部完成时返回None"""
+        self._wait_for_retry()
+        if self.delayed and self.delayed[0][0] <= time.monotonic():
+            return heapq.heappop(self.delayed)[2]
+        if self.fresh:
+            return self.fresh.popleft()
+        return None
+
+    def get_all(self):
+        """取出所有当前可以处理的网址，供多标签页同时加载"""
+        self._wait_for_retry()
+        tasks = []
+        while self.delayed and self.delayed[0][0] <= time.monotonic():
+            tasks.append(heapq.heappop(self.delayed)[2])
+        tasks.extend(self.fresh)
+        self.fresh.clear()
+        return tasks
+
+    def retry(self, task, reason):
+        """网址失败后重新排队，重试次数用完时放入 dead 并返回False"""
+        index, url, attempt = task
+        if attempt >= self.max_retries:
+            print(f'{url} 重试 {attempt} 次后仍失败，记录到失败列表')
+            self.dead.append((url, str(reason).replace('\t', ' ').replace('\n', ' ')[:200]))
+            return False
+        delay = min(self.max_delay, self.base_delay * 2 ** attempt)
+        delay = delay / 2 + random.uniform(0, delay / 2)
+        heapq.heappush(self.delayed, (time.monotonic() + delay, self.seq, (index, url, attempt + 1)))
+        self.seq += 1
+        print(f'{url} 失败，{delay:.0f} 秒后第 {attempt + 1} 次重试')
+        return True
+
+
+def load_dead_letters(path):
+    """读取上次重试后仍失败的网址"""
+    if not os.path.exists(path):
+        return []
+    with open(path, 'r', encoding='utf-8') as f:
+        return [line.split('\t', 1)[0].strip() for line in f if line.strip()]
+
+
+def save_dead_letters(path, dead):
+    """每行一个网址、失败原因和时间；没有失败的网址时删除文件"""
+    if not dead:
+        if os.path.exists(path):
+            os.remove(path)
+        return
+    now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    with open(path, 'w', encoding='utf-8') as f:
+        for url, reason in dead:
+            f.write(f'{url}\t{reason}\t{now}\n')
@@ -0,0 +1,293 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+from urllib.parse import urljoin
+
+import requests
+from requests.adapters import HTTPAdapter
+
+BASE_URL = 'https://appmagic.rocks'
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) Chrome/120.0.0.0'
+
+# 接口JSON中可能出现的字段名
+NAME_KEYS = ('name', 'title', 'appName')
+DATE_KEYS = ('releaseDate', 'release_date', 'releasedAt', 'released')
+URL_KEYS = ('url', 'link', 'appUrl', 'storeUrl')
+IMAGE_KEYS = ('icon', 'iconUrl', 'image', 'imageUrl', 'logo')
+COUNTRY_KEYS = ('countries', 'countriesCount', 'countryCount')
+PUBLISHER_KEYS = ('publisherName', 'publisher', 'companyName')
+# 录制和回放接口时只保留这些请求头；Cookie、Authorization等登录凭据不写入文件
+REPLAY_HEADERS = ('accept', 'accept-language', 'content-type', 'x-requested-with')
+
+
+def _replay_headers(headers: Optional[dict]) -> dict:
+    return {key: value for key, value in (headers or {}).items() if key.lower() in REPLAY_HEADERS}
+
+
+def enable_network_capture(options) -> None:
+    """开启Chrome性能日志，用于记录页面发出的XHR/JSON请求"""
+    options.set_capability('goog:loggingPrefs', {'performance': 'ALL'})
+
+
+def record_api_responses(driver, entries: Optional[List[dict]] = None) -> List[dict]:
+    """从性能日志中取出页面加载期间收到的JSON响应，entries为已经读出的日志"""
+    requests_sent: Dict[str, dict] = {}
+    responses = []
+    if entries is None:
+        entries = driver.get_log('performance')
+    for entry in entries:
+        message = json.loads(entry['message'])['message']
+        params = message.get('params', {})
+        if message.get('method') == 'Network.requestWillBeSent':
+            requests_sent[params['requestId']] = params['request']
+        elif message.get('method') == 'Network.responseReceived':
+            response = params['response']
+            if 'json' not in response.get('mimeType', '') or params.get('type') not in ('XHR', 'Fetch'):
+                continue
+            try:
+                body = driver.execute_cdp_cmd('Network.getResponseBody', {'requestId': params['requestId']})
+            except Exception:
+                continue
+            if body.get('base64Encoded'):
+                continue
+            request = requests_sent.get(params['requestId'], {})
+            headers = _replay_headers(request.get('headers'))
+            responses.append({
+                'url': response['url'],
+                'method': request.get('method', 'GET'),
+                'post_data': request.get('postData'),
+                'headers': headers,
+                'status': response.get('status'),
+                'body': body['body'],
+            })
+    return responses
+
+
+def _first(item: dict, keys):
+    for key in keys:
+        if item.get(key) not in (None, ''):
+            return item[key]
+    return None
+
+
+def _format_date(value, date_format: str) -> str:
+    """把接口返回的日期统一转换成页面上的日期格式"""
+    if value in (None, ''):
+        return 'N/A'
+    if isinstance(value, (int, float)):
+        # 毫秒时间戳
+        return datetime.fromtimestamp(value / 1000, tz=timezone.utc).strftime(date_format)
+    text = str(value)
+    try:
+        return datetime.fromisoformat(text.replace('Z', '+00:00')).strftime(date_format)
+    except ValueError:
+        pass
+    try:
+        return datetime.strptime(text, '%d-%m-%Y').strftime(date_format)
+    except ValueError:
+        return text
+
+
+def _iter_apps(node):
+    """遍历JSON，找出同时带有名称和上线日期的对象"""
+    if isinstance(node, dict):
+        if _first(node, NAME_KEYS) is not None and any(key in node for key in DATE_KEYS):
+            yield node
+            return
+        for value in node.values():
+            yield from _iter_apps(value)
+    elif isinstance(node, list):
+        for value in node:
+            yield from _iter_apps(value)
+
+
+def _find_company_name(node) -> Optional[str]:
+    if isinstance(node, dict):
+        for key in PUBLISHER_KEYS:
+            value = node.get(key)
+            if isinstance(value, str):
+                return value
+            if isinstance(value, dict) and isinstance(value.get('name'), str):
+                return value['name']
+        for value in node.values():
+            if isinstance(value, (dict, list)) and (name := _find_company_name(value)):
+                return name
+    elif isinstance(node, list):
+        for value in node:
+            if name := _find_company_name(value):
+                return name
+    return None
+
+
+def extract_games_from_payloads(payloads: List, source_url: str, company_name: Optional[str] = None,
+                                date_format: str = '%d-%m-%Y') -> List[dict]:
+    """从接口JSON中提取游戏信息，字段与 extract_game_info 一致"""
+    if company_name is None:
+        company_name = next((name for p in payloads if (name := _find_company_name(p))), 'N/A')
+
+    games = []
+    seen = set()
+    for payload in payloads:
+        for app in _iter_apps(payload):
+            url = _first(app, URL_KEYS)
+            if isinstance(url, str) and url.startswith('/'):
+                url = urljoin(BASE_URL, url)
+            countries = _first(app, COUNTRY_KEYS)
+            if isinstance(countries, list):
+                countries = len(countries)
+            game_info = {
+                'name': str(_first(app, NAME_KEYS)).strip(),
+                'url': url or 'N/A',
+                'image_url': _first(app, IMAGE_KEYS) or 'N/A',
+                'release_date': _format_date(_first(app, DATE_KEYS), date_format),
+                'countries': str(countries) if countries is not None else 'N/A',
+                'company_name': company_name,
+                'source_url': source_url,
+            }
+            key = (game_info['name'], game_info['release_date'], game_info['url'])
+            if key not in seen:
+                seen.add(key)
+                games.append(game_info)
+    return games
+
+
+def select_game_responses(responses: List[dict]) -> List[dict]:
+    """只保留能取出游戏的接口响应；这些响应里没有公司名称时，再保留第一个带公司名称的响应"""
+    payloads = []
+    for response in responses:
+        try:
+            payloads.append(json.loads(response['body']))
+        except ValueError:
+            payloads.append(None)
+    keep = {i for i, payload in enumerate(payloads) if payload is not None and next(_iter_apps(payload), None)}
+    if keep and not any(_find_company_name(payloads[i]) for i in keep):
+        company = next((i for i, payload in enumerate(payloads)
+                        if payload is not None and _find_company_name(payload)), None)
+        if company is not None:
+            keep.add(company)
+    return [response for i, response in enumerate(responses) if i in keep]
+
+
+def load_fixture(path: str) -> dict:
+    """读取录制好的接口响应"""
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def extract_games_from_fixture(path: str, date_format: str = '%d-%m-%Y') -> List[dict]:
+    """离线从录制文件中提取游戏信息"""
+    fixture = load_fixture(path)
+    payloads = [json.loads(response['body']) for response in fixture['responses']]
+    return extract_games_from_payloads(payloads, fixture['source_url'], date_format=date_format)
+
+
+class ApiRecorder:
+    def __init__(self, fixture_dir: str, endpoints_file: str):
+        self.fixture_dir = fixture_dir
+        self.endpoints_file = endpoints_file
+        self._lock = threading.Lock()
+
+    def record(self, driver, source_url: str, entries: Optional[List[dict]] = None) -> List[dict]:
+        """保存页面的接口响应，并记录该公司页面对应的接口地址"""
+        # 页面上还有统计、配置等其他JSON请求，只录制能取出游戏的接口
+        responses = select_game_responses([r for r in record_api_responses(driver, entries) if r['status'] == 200])
+        if not responses:
+            return responses
+        os.makedirs(self.fixture_dir, exist_ok=True)
+        name = hashlib.sha1(source_url.encode('utf-8')).hexdigest()[:16] + '.json'
+        with open(os.path.join(self.fixture_dir, name), 'w', encoding='utf-8') as f:
+            json.dump({'source_url': source_url, 'responses': responses}, f, ensure_ascii=False)
+
+        with self._lock:
+            endpoints = load_endpoints(self.endpoints_file)
+            endpoints[source_url] = [
+                {'url': r['url'], 'method': r['method'], 'post_data': r['post_data'], 'headers': r['headers']}
+                for r in responses
+            ]
+            with open(self.endpoints_file, 'w', encoding='utf-8') as f:
+                json.dump(endpoints, f, ensure_ascii=False, indent=2)
+        print(f"已录制 {len(responses)} 个接口响应: {source_url}")
+        return responses
+
+
+def load_endpoints(endpoints_file: str) -> Dict[str, List[dict]]:
+    if not os.path.exists(endpoints_file):
+        return {}
+    with open(endpoints_file, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+class ApiFetcher:
+    """直接请求录制的接口；与浏览器抓取一样从 ip_pool 选代理，并受 limiter 的按主机并发和退避限制"""
+
+    def __init__(self, endpoints: Dict[str, List[dict]], pool_size: int = 8, timeout: float = 15,
+                 proxy: Optional[str] = None, date_format: str = '%d-%m-%Y', ip_pool=None, limiter=None):
+        self.endpoints = endpoints
+        self.timeout = timeout
+        self.date_format = date_format
+        self.ip_pool = ip_pool
+        self.limiter = limiter
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.session.headers.update({'User-Agent': USER_AGENT, 'Accept': 'application/json'})
+        if proxy:
+            self.session.proxies.update({'http': f'http://{proxy}', 'https': f'http://{proxy}'})
+
+    def can_fetch(self, source_url: str) -> bool:
+        return bool(self.endpoints.get(source_url))
+
+    def _request(self, endpoint: dict, headers: dict):
+        proxy = self.ip_pool.get_random_ip() if self.ip_pool else None
+        proxies = {'http': f'http://{proxy}', 'https': f'http://{proxy}'} if proxy else None
+        host = self.limiter.acquire(endpoint['url']) if self.limiter else None
+        start = time.monotonic()
+        outcome = 'error'
+        try:
+            response = self.session.request(
+                endpoint.get('method', 'GET'),
+                endpoint['url'],
+                data=endpoint.get('post_data'),
+                headers=headers or None,
+                proxies=proxies,
+                timeout=self.timeout,
+            )
+            if response.status_code in (403, 429):
+                outcome = 'blocked'
+            response.raise_for_status()
+            outcome = 'ok'
+            return response
+        finally:
+            latency = time.monotonic() - start
+            if host is not None:
+                self.limiter.release(host, outcome, latency)
+            if self.ip_pool:
+                self.ip_pool.report(proxy, outcome == 'ok', latency, blocked=outcome == 'blocked')
+
+    def fetch_payloads(self, source_url: str) -> List:
+        payloads = []
+        for endpoint in self.endpoints[source_url]:
+            # 沿用录制时页面发出的请求头，旧的录制文件没有请求头
+            headers = _replay_headers(endpoint.get('headers'))
+            if endpoint.get('post_data') and not any(key.lower() == 'content-type' for key in headers):
+                headers['Content-Type'] = 'application/json'
+            payloads.append(self._request(endpoint, headers).json())
+        return payloads
+
+    def fetch_games(self, source_url: str) -> Optional[List[dict]]:
+        """不经过浏览器直接请求接口获取游戏信息，失败或接口返回的内容取不出游戏时返回None，交给浏览器抓取"""
+        try:
+            payloads = self.fetch_payloads(source_url)
+        except Exception as e:
+            print(f"接口请求失败 {source_url}: {e}")
+            return None
+        games = extract_games_from_payloads(payloads, source_url, date_format=self.date_format)
+        if not games:
+            print(f"接口返回的内容中没有游戏 {source_url}")
+            return None
+        return games
@@ -0,0 +1,279 @@
+import argparse
+import contextlib
+import glob
+import io
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+import game_parser
+from api_fetch import (ApiFetcher, extract_games_from_fixture, extract_games_from_payloads, load_fixture,
+                       select_game_responses)
+from crawl_pool import CrawlPool
+from main import extract_all_game_info, filter_and_sort_games, generate_html_file
+from rate_limiter import AdaptiveLimiter
+
+SOURCE_URL = 'https://appmagic.rocks/publisher/benchmark/1_Benchmark'
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+
+def make_publisher_page(rows: int, seed: int = 0, date_format: str = '%d-%m-%Y') -> str:
+    """生成与AppMagic公司页面结构相同的测试页面"""
+    rng = random.Random(seed)
+    start = datetime(2023, 1, 1)
+    parts = [
+        '<html><head><title>Publisher</title></head><body><app-root><div class="publisher-page">',
+        '<div class="publisher-name"> Benchmark Games Ltd. </div><div class="content">',
+    ]
+    for i in range(rows):
+        release = (start + timedelta(days=rng.randint(0, 900))).strftime(date_format)
+        parts.append(
+            f'<publisher-app-row _ngcontent-ng-c{i % 7} class="g-item parent-app-info-hover ng-star-inserted">'
+            f'<div class="cell app-cell"><svg class="icon"><use href="#store"></use></svg>'
+            f'<img class="application-image" src="https://images.appmagic.rocks/?uri=icon{i}.png">'
+            f'<a class="g-app-name link" href="/iphone/game-{i}/{6000000000 + i}"> Game {i} </a>'
+            f'<div class="tags">{"".join(f"<span class=tag>tag{j}</span>" for j in range(5))}</div></div>'
+            f'<div class="cell"><app-release-date><span class="release-date"><span>{release}</span></span>'
+            f'</app-release-date></div>'
+            f'<div class="cell"><span analyticsevent="publisher_page_show_countries_tooltip"> {rng.randint(1, 150)} </span></div>'
+            f'</publisher-app-row>'
+        )
+    parts.append('</div></div></app-root></body></html>')
+    return ''.join(parts)
+
+
+def _time(func, *args, repeat: int = 3):
+    """返回最快一次的耗时和结果，被测函数的输出不打印"""
+    best, result = None, None
+    for _ in range(repeat):
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            result = func(*args)
+            elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def _peak_memory(func, *args):
+    """单独运行一次并返回tracemalloc记录的内存峰值(字节)，不和计时混在一起，避免影响耗时"""
+    tracemalloc.start()
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            func(*args)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def make_api_payload(rows: int, seed: int = 0) -> dict:
+    """生成与公司页面内容对应的接口JSON"""
+    rng = random.Random(seed)
+    start = datetime(2023, 1, 1)
+    apps = [{
+        'name': f'Game {i}',
+        'url': f'/iphone/game-{i}/{6000000000 + i}',
+        'icon': f'https://images.appmagic.rocks/?uri=icon{i}.png',
+        'releaseDate': (start + timedelta(days=rng.randint(0, 900))).strftime('%Y-%m-%d'),
+        'countries': rng.randint(1, 150),
+    } for i in range(rows)]
+    return {'publisher': {'name': 'Benchmark Games Ltd.'}, 'apps': apps}
+
+
+def bench_parsers(pages, repeat: int = 3) -> bool:
+    """比较BeautifulSoup和lxml两种解析方式，并检查结果是否一致"""
+    backends = ['bs4'] + (['lxml'] if game_parser.lxml_available() else [])
+    print(f"{'page':<28}{'rows':>7}" + ''.join(f'{b + " (s)":>12}' for b in backends) + f"{'speedup':>10}  same")
+    all_same = True
+    for label, html in pages:
+        timings, results = [], []
+        for backend in backends:
+            elapsed, games = _time(lambda: extract_all_game_info(html, SOURCE_URL, backend=backend), repeat=repeat)
+            timings.append(elapsed)
+            results.append(games)
+        same = all(r == results[0] for r in results)
+        all_same = all_same and same
+        speedup = f'{timings[0] / timings[-1]:.1f}x' if len(timings) > 1 else '-'
+        print(f"{label:<28}{len(results[0]):>7}" + ''.join(f'{t:>12.4f}' for t in timings) + f"{speedup:>10}  {same}")
+    return all_same
+
+
+def check_api_fixtures(pattern: str) -> bool:
+    """离线检查录制的接口响应：取出的游戏与同名HTML页面的解析结果一致，录制时只保留需要的接口"""
+    all_same = True
+    for path in sorted(glob.glob(pattern)):
+        page_path = os.path.splitext(path)[0] + '.html'
+        if not os.path.exists(page_path):
+            continue
+        with open(page_path, 'r', encoding='utf-8') as f:
+            html = f.read()
+        fixture = load_fixture(path)
+        with contextlib.redirect_stdout(io.StringIO()):
+            expected = extract_all_game_info(html, fixture['source_url'])
+        games = extract_games_from_fixture(path)
+        selected = select_game_responses(fixture['responses'])
+        replayed = extract_games_from_payloads([json.loads(r['body']) for r in selected], fixture['source_url'])
+        same = games == expected and replayed == expected
+        all_same = all_same and same
+        print(f"{os.path.basename(path):<28}{len(games):>7}  接口 {len(selected)}/{len(fixture['responses'])}  same {same}")
+    return all_same
+
+
+def bench_stages(sizes, backend: str = 'bs4', repeat: int = 3) -> None:
+    """按游戏数量逐级测试解析、过滤排序、生成网页三个阶段的耗时、吞吐量和内存峰值"""
+    cutoff_date = datetime(2024, 1, 1)
+    print(f"{'stage':<22}{'rows':>8}{'seconds':>11}{'rows/s':>12}{'peak MB':>10}")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        output_file = os.path.join(tmp_dir, 'FindGame.html')
+        for rows in sizes:
+            html = make_publisher_page(rows)
+            with contextlib.redirect_stdout(io.StringIO()):
+                games = extract_all_game_info(html, SOURCE_URL, backend=backend)
+                filtered = filter_and_sort_games([dict(g) for g in games], cutoff_date)
+            stages = [
+                (f'extract ({backend})', rows, lambda: extract_all_game_info(html, SOURCE_URL, backend=backend)),
+                ('filter_and_sort_games', rows, lambda: filter_and_sort_games([dict(g) for g in games], cutoff_date)),
+                ('generate_html_file', len(filtered), lambda: generate_html_file(filtered, output_file)),
+            ]
+            for name, count, func in stages:
+                elapsed, _ = _time(func, repeat=repeat)
+                peak = _peak_memory(func)
+                print(f"{name:<22}{count:>8}{elapsed:>11.4f}{count / elapsed if elapsed else 0:>12.0f}"
+                      f"{peak / 2 ** 20:>10.1f}")
+
+
+class _StandInHandler(BaseHTTPRequestHandler):
+    """本地替身服务器：/publisher/<n> 返回公司页面，/api/<n> 返回接口JSON，每个请求延迟 delay 秒"""
+    rows = 200
+    delay = 0.05
+
+    def do_GET(self):
+        time.sleep(self.delay)
+        kind, _, number = self.path.strip('/').partition('/')
+        seed = int(number) if number.isdigit() else 0
+        if kind == 'publisher':
+            body, content_type = make_publisher_page(self.rows, seed).encode('utf-8'), 'text/html; charset=utf-8'
+        elif kind == 'api':
+            body, content_type = json.dumps(make_api_payload(self.rows, seed)).encode('utf-8'), 'application/json'
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class HttpDriver:
+    """用HTTP请求代替浏览器，只测试抓取调度本身的开销"""
+
+    def __init__(self):
+        self.session = requests.Session()
+        self.page_source = ''
+
+    def get(self, url):
+        response = self.session.get(url, timeout=30)
+        response.raise_for_status()
+        self.page_source = response.text
+
+    def execute_script(self, script, *args):
+        return 1
+
+    def quit(self):
+        self.session.close()
+
+
+def _fetch_page(session, url):
+    session.driver.get(url)
+    return session.driver.page_source
+
+
+def bench_fetch(pages: int, rows: int, delay: float, workers, backend: str = 'bs4') -> None:
+    """在本地替身服务器上测试 CrawlPool 和 ApiFetcher 的吞吐量"""
+    handler = type('Handler', (_StandInHandler,), {'rows': rows, 'delay': delay})
+    server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f'http://127.0.0.1:{server.server_address[1]}'
+    print(f"{'fetch layer':<22}{'workers':>8}{'pages':>8}{'seconds':>11}{'pages/s':>10}{'games':>9}")
+    try:
+        for count in workers:
+            urls = [f'{base_url}/publisher/{i}' for i in range(pages)]
+            pool = CrawlPool(create_driver=lambda proxy: HttpDriver(), fetch=_fetch_page,
+                             parse=lambda html, url: extract_all_game_info(html, url, backend=backend),
+                             concurrency=count, min_interval=0)
+            with contextlib.redirect_stdout(io.StringIO()):
+                start = time.perf_counter()
+                games = pool.run(urls)
+                elapsed = time.perf_counter() - start
+            print(f"{'CrawlPool':<22}{count:>8}{pages:>8}{elapsed:>11.3f}{pages / elapsed:>10.1f}{len(games):>9}")
+
+            endpoints = {url: [{'url': url.replace('/publisher/', '/api/'), 'method': 'GET', 'post_data': None}]
+                         for url in urls}
+            # 与 CrawlPool 一样经过按主机限流
+            fetcher = ApiFetcher(endpoints, pool_size=count, limiter=AdaptiveLimiter(count, 0))
+            with contextlib.redirect_stdout(io.StringIO()):
+                start = time.perf_counter()
+                with ThreadPoolExecutor(max_workers=count) as executor:
+                    results = list(executor.map(fetcher.fetch_games, urls))
+                elapsed = time.perf_counter() - start
+            api_games = sum(len(r) for r in results if r)
+            print(f"{'ApiFetcher':<22}{count:>8}{pages:>8}{elapsed:>11.3f}{pages / elapsed:>10.1f}{api_games:>9}")
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='离线性能测试')
+    parser.add_argument('--rows', type=int, nargs='+', default=[100, 1000, 5000], help='生成页面的游戏行数')
+    parser.add_argument('--pages', nargs='*', default=[], help='已保存的公司页面HTML文件(支持通配符)')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--api-fixtures', default=os.path.join(FIXTURE_DIR, '*.json'),
+                        help='录制的接口响应文件(支持通配符)，与同名的.html页面比较')
+    parser.add_argument('--parser', choices=['bs4', 'lxml'], default='bs4', help='分阶段测试使用的解析方式')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 5000, 10000],
+                        help='分阶段测试的游戏数量')
+    parser.add_argument('--fetch-pages', type=int, default=40, help='抓取测试的页面数量，0表示跳过')
+    parser.add_argument('--fetch-rows', type=int, default=200, help='抓取测试中每个页面的游戏行数')
+    parser.add_argument('--fetch-delay', type=float, default=0.05, help='替身服务器每个请求的延迟(秒)')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 4], help='抓取测试的并发数')
+    args = parser.parse_args()
+
+    pages = [(f'synthetic-{rows}', make_publisher_page(rows)) for rows in args.rows]
+    for pattern in args.pages:
+        for path in sorted(glob.glob(pattern)):
+            with open(path, 'r', encoding='utf-8') as f:
+                pages.append((os.path.basename(path)[:27], f.read()))
+
+    same = bench_parsers(pages, args.repeat)
+    print()
+    fixtures_same = check_api_fixtures(args.api_fixtures)
+    print()
+    bench_stages(args.sizes, args.parser, args.repeat)
+    if args.fetch_pages > 0:
+        print()
+        bench_fetch(args.fetch_pages, args.fetch_rows, args.fetch_delay, args.workers, args.parser)
+
+    if not same:
+        print("警告: 不同解析方式的结果不一致")
+    if not fixtures_same:
+        print("警告: 接口录制文件取出的游戏与页面不一致")
+    if not same or not fixtures_same:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -16,7 +16,7 @@ REM 激活虚拟环境
 call venv\Scripts\activate
 
 REM 安装依赖项
-pip install pyinstaller selenium beautifulsoup4
+pip install pyinstaller selenium beautifulsoup4 lxml
 
 REM 进入脚本文件所在目录
 cd /d %CURRENT_DIR%
@@ -0,0 +1,57 @@
+import json
+import os
+import threading
+import time
+from typing import Dict, List
+
+
+class CheckpointJournal:
+    """每解析完一个网址就把结果追加写入日志文件，程序中断后可以从日志恢复已完成的网址"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = None
+
+    def load(self) -> Dict[str, List[dict]]:
+        """读取已完成的网址及其游戏列表；最后一行没写完整时忽略该行"""
+        completed: Dict[str, List[dict]] = {}
+        if not os.path.exists(self.path):
+            return completed
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                completed[entry['url']] = entry['games']
+        return completed
+
+    def open(self, resume: bool) -> None:
+        """resume为False时清空旧日志重新开始"""
+        truncated = False
+        if resume and os.path.exists(self.path) and os.path.getsize(self.path) > 0:
+            with open(self.path, 'rb') as f:
+                f.seek(-1, os.SEEK_END)
+                truncated = f.read(1) != b'\n'
+        self._file = open(self.path, 'a' if resume else 'w', encoding='utf-8')
+        if truncated:
+            # 上次中断时最后一行没写完，换行后再继续追加
+            self._file.write('\n')
+
+    def record(self, url: str, games: List[dict]) -> None:
+        # 写入后立即刷到磁盘，浏览器崩溃或关闭窗口时不会丢失
+        line = json.dumps({'url': url, 'time': time.time(), 'games': games}, ensure_ascii=False)
+        with self._lock:
+            self._file.write(line + '\n')
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    def close(self, remove: bool = False) -> None:
+        """关闭日志，remove为True时表示整次运行已完成，删除日志文件"""
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+        if remove and os.path.exists(self.path):
+            os.remove(self.path)
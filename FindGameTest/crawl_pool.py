@@ -0,0 +1,250 @@
+import random
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+from driver_session import DriverSession
+from metrics import get_metrics
+from pipeline import ParsePipeline
+from rate_limiter import AdaptiveLimiter, detect_block
+from retry_queue import RetryQueue, RetryTask
+from tab_pool import TabPool
+
+
+class CrawlPool:
+    def __init__(self,
+                 create_driver: Callable[[Optional[str]], object],
+                 fetch: Callable[[object, str], Optional[str]],
+                 parse: Callable[[str, str], List[dict]],
+                 concurrency: int = 4,
+                 max_per_host: Optional[int] = None,
+                 min_interval: float = 0.5,
+                 ip_pool=None,
+                 max_restarts: int = 5,
+                 parse_workers: int = 0,
+                 parse_queue_size: int = 4,
+                 tabs: int = 1,
+                 prepare_tab: Optional[Callable[[object], None]] = None,
+                 harvest: Optional[Callable[[object], str]] = None,
+                 detect_block: Callable[[Optional[str]], Optional[str]] = detect_block,
+                 max_retries: int = 3,
+                 retry_delay: float = 30,
+                 on_html: Optional[Callable[[str, str], None]] = None):
+        self.create_driver = create_driver
+        self.fetch = fetch
+        self.parse = parse
+        self.concurrency = max(1, concurrency)
+        # 每个浏览器有tabs个标签页同时加载
+        self.tabs = max(1, tabs)
+        self.prepare_tab = prepare_tab
+        # fetch/harvest 返回的不是页面源码时(如页面内提取的JSON)，需要配套的拦截判断
+        self.harvest = harvest
+        self.detect_block = detect_block
+        # 同一主机的并发数从一半开始，网站正常时逐渐增加到上限，出错或被拦截时降低并退避
+        self.limiter = AdaptiveLimiter(max_per_host or self.concurrency * self.tabs, min_interval)
+        self.ip_pool = ip_pool
+        self.max_restarts = max_restarts
+        self.restarts: Dict[int, int] = {}
+        self.memory_reports: Dict[int, str] = {}
+        # parse_workers为0时在抓取线程内直接解析，否则交给独立的解析进程池
+        self.parse_workers = parse_workers
+        self.parse_queue_size = parse_queue_size
+        # 失败的网址延迟重试的次数和第一次重试的等待时间；重试次数用完的网址记录在 dead
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.dead: List[dict] = []
+        # 每个取回的页面在解析前交给 on_html(网址, 页面内容)，如保存快照
+        self.on_html = on_html
+
+    def _assign_proxies(self) -> List[Optional[str]]:
+        """为每个工作线程分配代理，IP足够时互不重复"""
+        if not self.ip_pool or not self.ip_pool.ip_list:
+            return [None] * self.concurrency
+        ips = list(self.ip_pool.ip_list)
+        random.shuffle(ips)
+        return [ips[i % len(ips)] for i in range(self.concurrency)]
+
+    def _worker(self, worker_id: int, proxy: Optional[str], tasks: RetryQueue,
+                on_page: Callable[[RetryTask, str], None]) -> None:
+        # 每个工作线程在整个网址列表中复用同一个浏览器
+        session = DriverSession(self.create_driver, proxy, self.ip_pool, self.max_restarts)
+        if self.tabs > 1:
+            self._tab_worker(worker_id, session, tasks, on_page)
+            return
+        try:
+            while True:
+                task = tasks.get()
+                if task is None:
+                    return
+                index, url = task.index, task.url
+                if task.proxy is not None and task.proxy == session.proxy and self.ip_pool:
+                    # 重试的网址换一个代理
+                    session.restart()
+                host = self.limiter.acquire(url)
+                start = time.monotonic()
+                html, outcome = None, 'error'
+                try:
+                    html = self.fetch(session, url)
+                    if html and self.detect_block(html):
+                        html, outcome = None, 'blocked'
+                    elif html:
+                        outcome = 'ok'
+                    elif session.busy:
+                        outcome = 'busy'
+                    elif session.last_blocked:
+                        outcome = 'blocked'
+                finally:
+                    if outcome == 'busy':
+                        # 没有请求网站，不影响该主机的并发上限，也不计入网址的重试次数
+                        self.limiter.release(host)
+                        tasks.requeue(task)
+                    else:
+                        self.limiter.release(host, outcome, time.monotonic() - start)
+                        # 取到的页面解析完成后才报告结果
+                        if outcome != 'ok':
+                            tasks.done(task, False, session.proxy, outcome)
+                if html:
+                    on_page(task, html)
+                elif outcome != 'busy' and session.exhausted and not session.is_healthy():
+                    print(f"[worker {worker_id}] 浏览器重启次数已用完，退出")
+                    return
+        finally:
+            self.restarts[worker_id] = session.restarts
+            session.quit()
+
+    def _tab_worker(self, worker_id: int, session: DriverSession, tasks: RetryQueue,
+                    on_page: Callable[[RetryTask, str], None]) -> None:
+        """一个浏览器的多个标签页同时加载不同的网址"""
+        taken = {}
+
+        def next_task():
+            task = tasks.get(block=False)
+            if task is None:
+                return None
+            taken[task.index] = task
+            return task.index, task.url
+
+        # 每个网址只报告一次结果，否则 RetryQueue 的计数出错，其他线程会一直等待
+        def on_success(index: int, url: str, html: str) -> None:
+            task = taken.pop(index, None)
+            if task is None:
+                return
+            on_page(task, html)
+
+        def on_failure(index: int, url: str) -> None:
+            task = taken.pop(index, None)
+            if task is None:
+                return
+            print(f"[worker {worker_id}] 页面加载失败: {url}")
+            tasks.done(task, False, session.proxy)
+
+        tab_pool = TabPool(session, self.tabs, self.limiter, prepare_tab=self.prepare_tab, harvest=self.harvest)
+        try:
+            while True:
+                try:
+                    tab_pool.run(next_task, on_success, on_failure)
+                    # 其他网址还在等待重试时，等到重试时间再继续
+                    if not tasks.wait():
+                        return
+                except Exception as e:
+                    print(f"[worker {worker_id}] 浏览器出错: {e}")
+                    if not session.restart():
+                        print(f"[worker {worker_id}] 浏览器重启次数已用完，退出")
+                        return
+        finally:
+            self.restarts[worker_id] = session.restarts
+            self.memory_reports[worker_id] = tab_pool.memory_report()
+            session.quit()
+
+    def run(self, urls: List[str],
+            on_games: Optional[Callable[[int, str, List[dict]], None]] = None) -> List[dict]:
+        """并发抓取所有网址，按原始顺序合并结果
+
+        on_games 在每个页面解析完成后立即调用，可用于流式处理结果
+        """
+        tasks = RetryQueue(urls, self.max_retries, self.retry_delay)
+
+        results: Dict[int, List[dict]] = {}
+        results_lock = threading.Lock()
+
+        # 已取到页面、正在解析的网址，解析完成后才向 RetryQueue 报告结果
+        parsing: Dict[int, RetryTask] = {}
+
+        def handle_games(index: int, url: str, games: List[dict]) -> None:
+            with results_lock:
+                tasks.done(parsing.pop(index), True)
+                results[index] = games
+                print(f"Processed {len(results)}/{len(urls)}: {url}")
+                if on_games:
+                    on_games(index, url, games)
+
+        def handle_parse_error(index: int, url: str, error: Exception) -> None:
+            # 与抓取失败一样延迟重试，重试次数用完后记入失败列表
+            with results_lock:
+                task = parsing.pop(index)
+            tasks.done(task, False, reason='parse')
+
+        pipeline = None
+        if self.parse_workers > 0:
+            pipeline = ParsePipeline(self.parse, handle_games, self.parse_workers, self.parse_queue_size,
+                                     on_error=handle_parse_error)
+            parse_page = pipeline.put
+        else:
+            def parse_page(index: int, url: str, html: str) -> None:
+                try:
+                    with get_metrics().stage('parse', url):
+                        games = self.parse(html, url)
+                except Exception as e:
+                    print(f"解析 {url} 出错: {e}")
+                    handle_parse_error(index, url, e)
+                    return
+                handle_games(index, url, games)
+
+        def on_page(task: RetryTask, html: str) -> None:
+            index, url = task.index, task.url
+            if self.on_html:
+                try:
+                    self.on_html(url, html)
+                except Exception as e:
+                    print(f"保存页面 {url} 出错: {e}")
+            with results_lock:
+                parsing[index] = task
+            # 结果已经报告给 RetryQueue，处理结果出错不能让工作线程退出
+            try:
+                parse_page(index, url, html)
+            except Exception as e:
+                print(f"处理页面 {url} 的结果出错: {e}")
+
+        workers = min(self.concurrency, len(urls))
+        proxies = self._assign_proxies()
+        threads = []
+        try:
+            for worker_id in range(workers):
+                thread = threading.Thread(
+                    target=self._worker,
+                    args=(worker_id, proxies[worker_id], tasks, on_page),
+                    daemon=True,
+                )
+                thread.start()
+                threads.append(thread)
+            for thread in threads:
+                thread.join()
+        finally:
+            # 所有浏览器都退出后还没抓取的网址也记为失败
+            tasks.close()
+            if pipeline is not None:
+                pipeline.close()
+        self.dead = tasks.dead
+
+        print(f"延迟重试 {tasks.retried} 次，最终失败 {len(self.dead)} 个网址")
+        print(f"浏览器重启次数: {sum(self.restarts.values())} {self.restarts}")
+        for host, stats in self.limiter.stats().items():
+            print(f"{host}: 并发上限 {stats['limit']}, 错误率 {stats['error_rate']:.0%}, 被拦截 {stats['blocks']} 次")
+        for worker_id, report in sorted(self.memory_reports.items()):
+            if report:
+                print(f"[worker {worker_id}] 标签页内存:\n{report}")
+
+        games = []
+        for index in sorted(results):
+            games.extend(results[index])
+        return games
@@ -0,0 +1,90 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+# 定时任务每天同一时间启动时，启动时间的细微差别不应让网址推迟一整天，间隔留出这个比例的余量
+RECRAWL_SLACK = 0.05
+
+
+def game_key(game: dict) -> str:
+    return f"{game['name']}_{game['release_date']}"
+
+
+def fingerprint(games: List[dict]) -> str:
+    """游戏列表的指纹，只取游戏名和发布日期，页面和接口得到的结果可以直接比较"""
+    keys = sorted(game_key(game) for game in games)
+    return hashlib.sha1('\n'.join(keys).encode('utf-8')).hexdigest()
+
+
+def newest_release(games: List[dict], date_format: str = '%d-%m-%Y') -> Optional[str]:
+    dates = []
+    for game in games:
+        try:
+            dates.append(datetime.strptime(game['release_date'], date_format))
+        except (KeyError, ValueError):
+            continue
+    return max(dates).strftime('%Y-%m-%d') if dates else None
+
+
+class CrawlState:
+    def __init__(self, state_file: str, recrawl_hours: float = 24):
+        self.state_file = state_file
+        self.recrawl_seconds = recrawl_hours * 3600
+        # 抓取时间记为本次运行的开始时间，而不是各网址解析完成的时间
+        self.run_started = time.time()
+        self.publishers: Dict[str, dict] = {}
+        self._lock = threading.Lock()
+        if os.path.exists(state_file):
+            with open(state_file, 'r', encoding='utf-8') as f:
+                self.publishers = json.load(f)
+
+    def is_due(self, url: str) -> bool:
+        """从未抓取过或距上次抓取超过间隔时需要重新抓取"""
+        entry = self.publishers.get(url)
+        return entry is None or self.run_started - entry['last_crawl'] >= self.recrawl_seconds * (1 - RECRAWL_SLACK)
+
+    def select(self, urls: List[str], probe: Optional[Callable[[str], Optional[str]]] = None) -> List[str]:
+        """选出需要用浏览器重新抓取的网址
+
+        probe 为轻量检查，返回游戏列表指纹，无法检查时返回None
+        """
+        selected = []
+        for url in urls:
+            if self.is_due(url):
+                selected.append(url)
+                continue
+            current = probe(url) if probe else None
+            if current is not None and current != self.publishers[url]['fingerprint']:
+                print(f"检测到更新: {url}")
+                selected.append(url)
+        print(f"增量模式: 需要抓取 {len(selected)}/{len(urls)} 个网址")
+        return selected
+
+    def update(self, url: str, games: List[dict]) -> List[dict]:
+        """记录本次抓取结果，返回之前没有见过的游戏"""
+        if not games:
+            # 没有取到游戏行多半是页面没加载好，不更新状态，下次继续抓取
+            return []
+        with self._lock:
+            entry = self.publishers.get(url, {'seen': []})
+            seen = set(entry['seen'])
+            new_games = [game for game in games if game_key(game) not in seen]
+            self.publishers[url] = {
+                'last_crawl': self.run_started,
+                'fingerprint': fingerprint(games),
+                'newest_release': newest_release(games) or entry.get('newest_release'),
+                'seen': sorted(seen | {game_key(game) for game in games}),
+            }
+            return new_games
+
+    def save(self) -> None:
+        with self._lock:
+            data = json.dumps(self.publishers, ensure_ascii=False, indent=2)
+        tmp_file = self.state_file + '.tmp'
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            f.write(data)
+        os.replace(tmp_file, self.state_file)
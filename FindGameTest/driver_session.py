@@ -0,0 +1,85 @@
+from typing import Callable, Optional
+
+from metrics import get_metrics
+
+
+class DriverSession:
+    def __init__(self,
+                 create_driver: Callable[[Optional[str]], object],
+                 proxy: Optional[str] = None,
+                 ip_pool=None,
+                 max_restarts: int = 5):
+        self.create_driver = create_driver
+        self.proxy = proxy
+        self.ip_pool = ip_pool
+        self.max_restarts = max_restarts
+        self.restarts = 0
+        self.launches = 0
+        # 最近一次请求是否被网站拦截
+        self.last_blocked = False
+        # 对冲请求中落后被取消时为True，抓取函数不再重试
+        self.cancelled = False
+        # 被取消的请求还占用着浏览器、这次没有请求网站时为True，网址重新排队，不计入失败
+        self.busy = False
+        self._driver = None
+
+    @property
+    def driver(self):
+        """获取浏览器实例，不存在时才创建"""
+        if self._driver is None:
+            self.launches += 1
+            with get_metrics().stage('browser_start'):
+                self._driver = self.create_driver(self.proxy)
+        return self._driver
+
+    @property
+    def exhausted(self) -> bool:
+        """重启次数是否已用完"""
+        return self.restarts >= self.max_restarts
+
+    def is_healthy(self) -> bool:
+        """检查浏览器会话是否仍然可用"""
+        if self._driver is None:
+            return False
+        try:
+            self._driver.execute_script('return 1')
+            return True
+        except Exception:
+            return False
+
+    def restart(self, rotate_proxy: bool = True) -> bool:
+        """关闭当前浏览器，下次使用时再重新创建；超出重启次数时返回False"""
+        if self.exhausted:
+            return False
+        self.restarts += 1
+        get_metrics().count('browser_restart')
+        self._quit_driver()
+        if rotate_proxy and self.ip_pool:
+            self.proxy = self.ip_pool.get_random_ip()
+        print(f"浏览器重启 {self.restarts}/{self.max_restarts}，代理: {self.proxy}")
+        return True
+
+    def cancel(self, rotate_proxy: bool = True) -> None:
+        """取消正在进行的请求：关闭浏览器使阻塞的调用立即出错，不计入重启次数"""
+        self.cancelled = True
+        self._quit_driver()
+        if rotate_proxy and self.ip_pool:
+            self.proxy = self.ip_pool.get_random_ip()
+
+    def report(self, success: bool, latency: Optional[float] = None, blocked: bool = False) -> None:
+        """把本次请求结果计入当前代理的健康评分"""
+        self.last_blocked = blocked
+        if self.ip_pool:
+            self.ip_pool.report(self.proxy, success, latency, blocked)
+
+    def _quit_driver(self) -> None:
+        if self._driver is not None:
+            try:
+                self._driver.quit()
+            except Exception:
+                pass
+            self._driver = None
+
+    def quit(self) -> None:
+        """关闭浏览器"""
+        self._quit_driver()
@@ -0,0 +1,121 @@
+import csv
+import json
+import os
+from datetime import date, datetime
+from typing import Dict, Iterable, Iterator, List, Optional
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow为可选依赖，没有安装时不能导出parquet
+    pa = None
+    pq = None
+
+# 列名和类型：release_date 为日期，countries 为整数，其余为字符串；无法识别的值为空
+COLUMNS = ('name', 'url', 'image_url', 'release_date', 'countries', 'company_name', 'source_url')
+EXPORT_FORMATS = ('jsonl', 'csv', 'parquet')
+BATCH_SIZE = 10000
+
+
+def pyarrow_available() -> bool:
+    return pa is not None
+
+
+def _to_date(game: dict, date_format: str) -> Optional[date]:
+    parsed = game.get('parsed_date')
+    if isinstance(parsed, datetime):
+        return parsed.date()
+    try:
+        return datetime.strptime(game.get('release_date', ''), date_format).date()
+    except (TypeError, ValueError):
+        return None
+
+
+def _to_int(value) -> Optional[int]:
+    try:
+        return int(str(value).strip().replace(',', ''))
+    except (TypeError, ValueError):
+        return None
+
+
+def _to_str(value) -> Optional[str]:
+    return None if value in (None, 'N/A') else str(value)
+
+
+def iter_records(games: Iterable[dict], date_format: str = '%d-%m-%Y') -> Iterator[Dict[str, object]]:
+    """把游戏信息转换成带类型的记录"""
+    for game in games:
+        record = {column: _to_str(game.get(column)) for column in COLUMNS}
+        record['release_date'] = _to_date(game, date_format)
+        record['countries'] = _to_int(game.get('countries'))
+        yield record
+
+
+def export_jsonl(records: Iterable[dict], path: str) -> int:
+    count = 0
+    with open(path, 'w', encoding='utf-8') as f:
+        for record in records:
+            release_date = record['release_date']
+            line = dict(record, release_date=release_date.isoformat() if release_date else None)
+            f.write(json.dumps(line, ensure_ascii=False) + '\n')
+            count += 1
+    return count
+
+
+def export_csv(records: Iterable[dict], path: str) -> int:
+    count = 0
+    # utf-8-sig 让Excel直接打开时中文不乱码
+    with open(path, 'w', encoding='utf-8-sig', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=COLUMNS)
+        writer.writeheader()
+        for record in records:
+            writer.writerow(record)
+            count += 1
+    return count
+
+
+def export_parquet(records: Iterable[dict], path: str, batch_size: int = BATCH_SIZE) -> int:
+    """分批写入parquet，内存中最多只有batch_size条记录"""
+    if pa is None:
+        raise RuntimeError("未安装pyarrow，无法导出parquet")
+    schema = pa.schema([
+        ('name', pa.string()),
+        ('url', pa.string()),
+        ('image_url', pa.string()),
+        ('release_date', pa.date32()),
+        ('countries', pa.int32()),
+        ('company_name', pa.string()),
+        ('source_url', pa.string()),
+    ])
+    count = 0
+    batch: List[dict] = []
+    with pq.ParquetWriter(path, schema) as writer:
+        for record in records:
+            batch.append(record)
+            if len(batch) >= batch_size:
+                writer.write_table(pa.Table.from_pylist(batch, schema=schema))
+                count += len(batch)
+                batch = []
+        if batch or count == 0:
+            writer.write_table(pa.Table.from_pylist(batch, schema=schema))
+            count += len(batch)
+    return count
+
+
+_EXPORTERS = {'jsonl': export_jsonl, 'csv': export_csv, 'parquet': export_parquet}
+
+
+def export_games(games: List[dict], output_file: str, formats: Iterable[str],
+                 date_format: str = '%d-%m-%Y') -> List[str]:
+    """按格式导出到与output_file同名、扩展名不同的文件，返回生成的文件列表"""
+    base = os.path.splitext(output_file)[0]
+    files = []
+    for export_format in formats:
+        if export_format == 'parquet' and pa is None:
+            print("未安装pyarrow，跳过parquet导出")
+            continue
+        path = f'{base}.{export_format}'
+        count = _EXPORTERS[export_format](iter_records(games, date_format), path)
+        print(f"已导出 {count} 条记录: {path}")
+        files.append(path)
+    return files
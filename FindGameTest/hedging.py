@@ -0,0 +1,179 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+from typing import Callable, List, Optional
+
+from driver_session import DriverSession
+from metrics import get_metrics
+
+
+class LatencyTracker:
+    """记录最近的页面加载耗时，给出对冲请求的触发时间"""
+
+    def __init__(self, window: int = 50, percentile: float = 90, min_samples: int = 5,
+                 default: float = 20.0, floor: float = 3.0):
+        self.samples: deque = deque(maxlen=window)
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.default = default
+        self.floor = floor
+        self._lock = threading.Lock()
+
+    def add(self, seconds: float) -> None:
+        with self._lock:
+            self.samples.append(seconds)
+
+    def threshold(self) -> float:
+        """样本不足时使用默认值，否则取最近耗时的百分位数"""
+        with self._lock:
+            if len(self.samples) < self.min_samples:
+                return self.default
+            ordered = sorted(self.samples)
+        index = min(len(ordered) - 1, int(len(ordered) * self.percentile / 100))
+        return max(self.floor, ordered[index])
+
+
+class _WorkerState:
+    def __init__(self):
+        self.hedge: Optional[DriverSession] = None
+        # 上一个网址中还没结束的请求(已取消)，再次使用同一个会话前要等它结束
+        self.pending: dict = {}
+
+
+class HedgedFetcher:
+    """对冲请求：页面超过最近加载耗时的百分位数还没完成时，用另一个代理的浏览器同时请求，先完成的为准
+
+    fetch(session, url) 为普通的抓取函数；每个工作线程额外保留一个对冲用的浏览器，
+    落后的一方会被取消(关闭浏览器)，整个网址的耗时不超过 deadline 秒
+    """
+
+    def __init__(self, fetch: Callable[[DriverSession, str], Optional[str]],
+                 create_driver: Callable[[Optional[str]], object],
+                 ip_pool=None, percentile: float = 90, deadline: float = 120.0,
+                 tracker: Optional[LatencyTracker] = None):
+        self.fetch = fetch
+        self.create_driver = create_driver
+        self.ip_pool = ip_pool
+        self.deadline = deadline
+        self.tracker = tracker or LatencyTracker(percentile=percentile)
+        self.hedges = 0
+        self.hedge_wins = 0
+        self._local = threading.local()
+        self._states: List[_WorkerState] = []
+        self._lock = threading.Lock()
+
+    def _state(self) -> _WorkerState:
+        state = getattr(self._local, 'state', None)
+        if state is None:
+            state = self._local.state = _WorkerState()
+            with self._lock:
+                self._states.append(state)
+        return state
+
+    def _other_proxy(self, proxy: Optional[str]) -> Optional[str]:
+        if not self.ip_pool:
+            return None
+        for _ in range(5):
+            candidate = self.ip_pool.get_random_ip()
+            if candidate != proxy:
+                return candidate
+        return proxy
+
+    def _wait_pending(self, state: _WorkerState, session: DriverSession, timeout: float) -> bool:
+        """等待该会话上被取消的请求结束，返回会话是否可用"""
+        future = state.pending.get(id(session))
+        if future is None:
+            return True
+        done, _ = wait([future], timeout=timeout)
+        if done:
+            del state.pending[id(session)]
+            return True
+        return False
+
+    def _submit(self, session: DriverSession, url: str) -> Future:
+        """每个请求单独一个线程，不会排在卡住的请求后面，等待时间不计入阈值和期限"""
+        session.cancelled = False
+        future: Future = Future()
+
+        def run():
+            if not future.set_running_or_notify_cancel():
+                return
+            try:
+                future.set_result(self.fetch(session, url))
+            except Exception as e:
+                future.set_exception(e)
+
+        threading.Thread(target=run, daemon=True).start()
+        return future
+
+    def __call__(self, session: DriverSession, url: str) -> Optional[str]:
+        state = self._state()
+        start = time.monotonic()
+        threshold = self.tracker.threshold()
+        # 上一个网址被取消的请求还在使用这个浏览器时不能同时再用，网址重新排队稍后再抓
+        session.busy = not self._wait_pending(state, session, threshold)
+        if session.busy:
+            print(f"浏览器上一个请求还没结束，稍后重新抓取: {url}")
+            get_metrics().count('hedge_busy')
+            return None
+        futures = {self._submit(session, url): session}
+        done, _ = wait(list(futures), timeout=threshold)
+
+        if not done:
+            # 主请求超过阈值还没完成，换一个代理发起对冲请求；对冲浏览器还被占用时不对冲
+            if state.hedge is None:
+                state.hedge = DriverSession(self.create_driver, self._other_proxy(session.proxy), self.ip_pool)
+            if self._wait_pending(state, state.hedge, 0):
+                print(f"页面 {threshold:.1f}s 内未完成，发起对冲请求: {url}")
+                self.hedges += 1
+                get_metrics().count('hedge')
+                futures[self._submit(state.hedge, url)] = state.hedge
+
+        result = None
+        winner = None
+        remaining = list(futures)
+        while remaining and winner is None:
+            timeout = self.deadline - (time.monotonic() - start)
+            if timeout <= 0:
+                break
+            done, _ = wait(remaining, timeout=timeout, return_when=FIRST_COMPLETED)
+            if not done:
+                break
+            for future in done:
+                remaining.remove(future)
+                try:
+                    html = future.result()
+                except Exception as e:
+                    print(f"请求出错 {url}: {e}")
+                    html = None
+                if html and winner is None:
+                    result, winner = html, futures[future]
+
+        # 取消落后或超时的请求：关闭其浏览器，下次使用时换代理重新启动
+        for future in remaining:
+            loser = futures[future]
+            loser.cancel()
+            state.pending[id(loser)] = future
+
+        if winner is not None:
+            self.tracker.add(time.monotonic() - start)
+            if winner is state.hedge:
+                self.hedge_wins += 1
+        elif remaining:
+            print(f"超过 {self.deadline:.0f}s 仍未完成，放弃: {url}")
+            get_metrics().count('hedge_deadline')
+        return result
+
+    def close(self) -> None:
+        """关闭所有对冲用的浏览器"""
+        with self._lock:
+            states = list(self._states)
+        for state in states:
+            if state.hedge is not None:
+                state.hedge.cancel()
+            wait(list(state.pending.values()), timeout=self.deadline)
+            if state.hedge is not None:
+                state.hedge.quit()
+        if self.hedges:
+            print(f"对冲请求 {self.hedges} 次，其中 {self.hedge_wins} 次先完成")
@@ -1,86 +1,255 @@
+import json
+import os
 import random
 import requests
+import threading
 import time
-from typing import List, Optional
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from rate_limiter import backoff_delay
+
+
+@dataclass
+class ProxyStats:
+    """代理的滚动健康评分"""
+    latency: float = 1.0
+    success_rate: float = 1.0
+    uses: int = 0
+    blocks: int = 0
+    # 被网站拦截后暂停使用到这个时间(time.monotonic)
+    cooldown_until: float = 0.0
+
+    def update(self, success: bool, latency: Optional[float] = None, alpha: float = 0.3) -> None:
+        self.uses += 1
+        self.success_rate = (1 - alpha) * self.success_rate + alpha * (1.0 if success else 0.0)
+        if latency is not None:
+            self.latency = (1 - alpha) * self.latency + alpha * latency
+
+    @property
+    def score(self) -> float:
+        # 成功率越高、延迟越低，被选中的概率越大
+        return max(self.success_rate, 0.01) / max(self.latency, 0.05)
+
 
 class IPPool:
-    def __init__(self, proxy_file: str = "proxies.txt"):
+    def __init__(self, proxy_file: str = "proxies.txt",
+                 test_url: str = "https://www.baidu.com",
+                 timeout: float = 5,
+                 max_workers: int = 32,
+                 cache_file: Optional[str] = None,
+                 cache_ttl: float = 3600):
         self.ip_list: List[str] = []
         self.current_ip: Optional[str] = None
-        self.test_url = "https://www.baidu.com"
+        self.test_url = test_url
+        self.timeout = timeout
+        self.max_workers = max_workers
         self.proxy_file = proxy_file
+        # 代理测试结果缓存，默认和代理文件放在一起
+        self.cache_file = cache_file or os.path.join(os.path.dirname(os.path.abspath(proxy_file)), 'proxy_cache.json')
+        self.cache_ttl = cache_ttl
+        self.cache: Dict[str, dict] = {}
+        self.stats: Dict[str, ProxyStats] = {}
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        self._revalidate_thread: Optional[threading.Thread] = None
+        self._load_cache()
         self._load_proxies()
-    
+
     def _load_proxies(self) -> None:
-        """从文件加载代理IP"""
+        """从文件加载代理IP，缓存未过期的直接使用，过期的重新测试"""
         try:
             with open(self.proxy_file, 'r', encoding='utf-8') as f:
-                proxies = [line.strip() for line in f if line.strip()]
-                self.add_ips(proxies)
+                proxies = [line.strip() for line in f if line.strip() and not line.startswith('#')]
         except FileNotFoundError:
             print(f"代理IP文件 {self.proxy_file} 不存在")
-    
+            return
+
+        now = time.time()
+        stale = []
+        for ip in dict.fromkeys(proxies):
+            entry = self.cache.get(ip)
+            # 用其他测试网址(如本地替身服务器)测出的结果不可信，当作没有缓存
+            if entry and entry.get('test_url') != self.test_url:
+                entry = None
+            # 上次可用的代理先放入池中，过期的在后台复测，复测失败再移除
+            if entry and entry['ok']:
+                self._accept(ip, entry['latency'])
+            if not entry or now - entry['last_checked'] >= self.cache_ttl:
+                stale.append(ip)
+
+        if not stale:
+            print(f"使用缓存代理: {len(self.ip_list)}")
+        elif not self.ip_list:
+            # 没有可用的缓存代理，只能先同步测试
+            self.add_ips(stale)
+        else:
+            print(f"使用缓存代理: {len(self.ip_list)}，后台重新测试 {len(stale)} 个过期代理")
+            self._revalidate_thread = threading.Thread(target=self.add_ips, args=(stale,), daemon=True)
+            self._revalidate_thread.start()
+
+    def _load_cache(self) -> None:
+        try:
+            with open(self.cache_file, 'r', encoding='utf-8') as f:
+                self.cache = json.load(f)
+        except (FileNotFoundError, ValueError):
+            self.cache = {}
+
+    def _save_cache(self) -> None:
+        """先写临时文件再替换，避免中途退出导致缓存损坏"""
+        with self._lock:
+            data = json.dumps(self.cache, ensure_ascii=False, indent=2)
+        tmp_file = self.cache_file + '.tmp'
+        with self._save_lock:
+            try:
+                with open(tmp_file, 'w', encoding='utf-8') as f:
+                    f.write(data)
+                os.replace(tmp_file, self.cache_file)
+            except OSError as e:
+                print(f"保存代理缓存失败: {e}")
+
+    def _record(self, ip: str, ok: bool, latency: Optional[float] = None) -> None:
+        with self._lock:
+            entry = self.cache.setdefault(ip, {'failures': 0})
+            entry['last_checked'] = time.time()
+            entry['test_url'] = self.test_url
+            entry['ok'] = ok
+            entry['latency'] = latency if latency is not None else entry.get('latency', self.timeout)
+            if not ok:
+                entry['failures'] += 1
+
+    def _accept(self, ip: str, latency: float) -> None:
+        with self._lock:
+            if ip not in self.ip_list:
+                self.ip_list.append(ip)
+            # 运行中后台复测通过时只更新已有的评分，不清除拦截冷却和使用记录
+            stats = self.stats.get(ip)
+            if stats is None:
+                self.stats[ip] = ProxyStats(latency=latency)
+            else:
+                stats.update(True, latency)
+
+    def _discard(self, ip: str) -> None:
+        with self._lock:
+            if ip in self.ip_list:
+                self.ip_list.remove(ip)
+            if self.current_ip == ip:
+                self.current_ip = None
+
     def add_ip(self, ip: str) -> None:
         """添加单个IP到池中"""
-        if self._test_ip(ip):
-            self.ip_list.append(ip)
-    
+        ok, latency = self._test_ip(ip)
+        self._record(ip, ok, latency)
+        if ok:
+            self._accept(ip, latency)
+        self._save_cache()
+
     def add_ips(self, ips: List[str]) -> None:
-        """批量添加IP到池中"""
-        for ip in ips:
-            self.add_ip(ip)
-    
+        """并发测试并批量添加IP到池中"""
+        ips = list(dict.fromkeys(ips))
+        if not ips:
+            return
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(ips))) as executor:
+            for ip, (ok, latency) in zip(ips, executor.map(self._test_ip, ips)):
+                self._record(ip, ok, latency)
+                if ok:
+                    self._accept(ip, latency)
+                else:
+                    self._discard(ip)
+        self._save_cache()
+        print(f"可用代理: {len(self.ip_list)}/{len(ips)}")
+
     def get_random_ip(self) -> Optional[str]:
-        """随机获取一个IP"""
-        if not self.ip_list:
-            return None
-        self.current_ip = random.choice(self.ip_list)
-        return self.current_ip
-    
+        """按健康评分加权随机获取一个IP"""
+        with self._lock:
+            if not self.ip_list:
+                return None
+            # 跳过被拦截后还在冷却中的代理，全部在冷却时仍从全部代理中选
+            now = time.monotonic()
+            candidates = [ip for ip in self.ip_list
+                          if self.stats.get(ip, ProxyStats()).cooldown_until <= now] or self.ip_list
+            weights = [self.stats.get(ip, ProxyStats()).score for ip in candidates]
+            self.current_ip = random.choices(candidates, weights=weights)[0]
+            return self.current_ip
+
+    def report(self, ip: Optional[str], success: bool, latency: Optional[float] = None,
+               blocked: bool = False) -> None:
+        """记录一次使用代理的结果，更新滚动评分；被拦截的代理按拦截次数指数退避暂停使用"""
+        if not ip:
+            return
+        with self._lock:
+            stats = self.stats.setdefault(ip, ProxyStats())
+            stats.update(success, latency)
+            if blocked:
+                stats.blocks += 1
+                delay = backoff_delay(stats.blocks - 1, 60, 1800)
+                stats.cooldown_until = time.monotonic() + delay
+                print(f"代理 {ip} 被拦截，暂停使用 {delay:.0f}s")
+
+    def remove_ip(self, ip: str) -> None:
+        """从池中移除指定IP，并在缓存中记为失败"""
+        self._discard(ip)
+        self._record(ip, False)
+        self._save_cache()
+
     def remove_current_ip(self) -> None:
         """从池中移除当前IP"""
-        if self.current_ip and self.current_ip in self.ip_list:
-            self.ip_list.remove(self.current_ip)
-            self.current_ip = None
-    
-    def _test_ip(self, ip: str) -> bool:
-        """测试IP是否可用"""
+        if self.current_ip:
+            self.remove_ip(self.current_ip)
+
+    def _test_ip(self, ip: str) -> Tuple[bool, float]:
+        """测试IP是否可用，返回 (是否可用, 延迟秒数)"""
+        start = time.monotonic()
         try:
-            print(f"正在测试IP: {ip}")
             proxies = {
                 "http": f"http://{ip}",
                 "https": f"http://{ip}"
             }
-            # 只测试百度
             response = requests.get(
-                "https://www.baidu.com", 
-                proxies=proxies, 
-                timeout=5,
+                self.test_url,
+                proxies=proxies,
+                timeout=self.timeout,
                 headers={
                     'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) Chrome/120.0.0.0'
                 }
             )
+            latency = time.monotonic() - start
             success = response.status_code == 200
-            print(f"测试结果: {'成功' if success else '失败'} (状态码: {response.status_code})")
-            return success
+            print(f"测试IP {ip}: {'成功' if success else '失败'} (状态码: {response.status_code}, {latency:.2f}s)")
+            return success, latency
         except Exception as e:
-            print(f"测试出错: {str(e)}")
-            return False
+            print(f"测试IP {ip} 出错: {str(e)}")
+            return False, time.monotonic() - start
+
+
+_shared_pool: Optional[IPPool] = None
+_shared_pool_lock = threading.Lock()
+
+
+def get_shared_pool(**kwargs) -> IPPool:
+    """获取进程内共享的IP池，只在第一次调用时测试代理"""
+    global _shared_pool
+    with _shared_pool_lock:
+        if _shared_pool is None:
+            _shared_pool = IPPool(**kwargs)
+        return _shared_pool
+
 
 if __name__ == "__main__":
     print("开始测试IP池...")
     # 创建实例后再访问 proxy_file
     pool = IPPool()
     print(f"当前代理文件: {pool.proxy_file}")
-    
+
     # 读取所有IP
     print("\n从文件读取的IP:")
     with open("proxies.txt", 'r', encoding='utf-8') as f:
         ips = [line.strip() for line in f if line.strip() and not line.startswith('#')]
         for ip in ips:
             print(f"- {ip}")
-    
+
     # 打印可用的IP列表
     print("\n测试后可用的IP列表:")
     for ip in pool.ip_list:
-        print(f"- {ip}") 
\ No newline at end of file
+        print(f"- {ip}: {pool.stats[ip]}")
@@ -0,0 +1,70 @@
+import json
+from typing import List, Optional
+
+from page_ready import APP_ROW_SELECTOR
+
+BASE_URL = 'https://appmagic.rocks'
+COUNTRIES_SELECTOR = 'span[analyticsevent="publisher_page_show_countries_tooltip"]'
+
+# 在页面中直接取出公司名称和每个游戏行的字段，返回很小的JSON字符串，
+# 不再通过WebDriver传回整个页面；字段取法与 extract_game_info 相同，缺失时为null，去空白在Python中做
+EXTRACT_SCRIPT = '''
+function text(el) { return el ? el.textContent : null; }
+var company = document.querySelector('div.publisher-name');
+var rows = document.querySelectorAll(arguments[0]);
+var games = [];
+for (var i = 0; i < rows.length; i++) {
+    var row = rows[i];
+    var link = row.querySelector('a.g-app-name');
+    var image = row.querySelector('img.application-image');
+    games.push([
+        text(link),
+        link ? link.getAttribute('href') : null,
+        image ? image.getAttribute('src') : null,
+        text(row.querySelector('span.release-date')),
+        text(row.querySelector(arguments[1]))
+    ]);
+}
+return JSON.stringify({company: text(company), games: games});
+'''
+
+
+def extract_payload(driver) -> str:
+    """在页面中执行提取脚本，返回JSON字符串"""
+    return driver.execute_script(EXTRACT_SCRIPT, APP_ROW_SELECTOR, COUNTRIES_SELECTOR)
+
+
+def _strip(value: Optional[str]) -> str:
+    return value.strip() if value is not None else 'N/A'
+
+
+def games_from_payload(payload: str, source_url: str) -> List[dict]:
+    """把提取脚本返回的JSON转换成与 extract_all_game_info 相同的游戏列表"""
+    data = json.loads(payload)
+    company_name = _strip(data['company'])
+    print(f"Found {len(data['games'])} game rows")
+    games = []
+    for name, href, image_url, release_date, countries in data['games']:
+        url = href if href is not None else 'N/A'
+        if url.startswith('/'):
+            url = BASE_URL + url
+        games.append({
+            'name': _strip(name),
+            'url': url,
+            'image_url': image_url if image_url is not None else 'N/A',
+            'release_date': _strip(release_date),
+            'countries': _strip(countries),
+            'company_name': company_name,
+            'source_url': source_url,
+        })
+    return games
+
+
+def detect_block_in_payload(payload: Optional[str]) -> Optional[str]:
+    """提取结果中既没有游戏行也没有公司名称时视为被拦截，与 detect_block 的判断一致"""
+    if not payload:
+        return 'no-content'
+    data = json.loads(payload)
+    if data['games'] or data['company'] is not None:
+        return None
+    return 'no-app-rows'
@@ -0,0 +1,99 @@
+import json
+import threading
+from typing import Dict, List
+
+# 只读取DOM文字和img的src属性，图片、字体、样式、媒体文件都不需要下载
+BLOCKED_EXTENSIONS = [
+    'png', 'jpg', 'jpeg', 'gif', 'webp', 'svg', 'ico',
+    'woff', 'woff2', 'ttf', 'otf', 'eot',
+    'css',
+    'mp4', 'webm', 'mp3',
+]
+# 扩展名必须在网址末尾或紧接着查询参数，不拦截 .icon、/api/x.css/data 这类只是包含扩展名的地址；
+# 规则中 ? 是通配符，\? 才表示问号本身。查询参数以扩展名结尾的地址(如 ?file=a.css)仍会匹配，
+# 这种情况拦截到数据请求时 LeanRenderStats 会给出警告
+BLOCKED_RESOURCE_PATTERNS = [pattern for extension in BLOCKED_EXTENSIONS
+                             for pattern in (f'*.{extension}', f'*.{extension}\\?*')]
+# 被拦截后页面就拿不到数据的请求类型，出现时说明规则拦截了网站自己的接口
+DATA_REQUEST_TYPES = ('XHR', 'Fetch', 'Document')
+
+# 统计和广告等第三方域名；网站自己的接口和JS文件不能拦截，以上规则只按扩展名和第三方域名匹配
+BLOCKED_DOMAIN_PATTERNS = [
+    '*google-analytics.com*', '*googletagmanager.com*', '*doubleclick.net*', '*googlesyndication.com*',
+    '*facebook.net*', '*facebook.com/tr*', '*connect.facebook*', '*hotjar.com*', '*mc.yandex.ru*',
+    '*yandex.ru/metrika*', '*intercom.io*', '*intercomcdn.com*', '*sentry.io*', '*amplitude.com*',
+    '*segment.io*', '*segment.com*', '*clarity.ms*', '*criteo*', '*adservice*',
+]
+
+# 被拦截的请求无法知道实际大小，按常见大小估算节省的流量
+TYPICAL_SIZE = {
+    'Image': 15 * 1024,
+    'Font': 40 * 1024,
+    'Stylesheet': 30 * 1024,
+    'Media': 200 * 1024,
+    'Script': 60 * 1024,
+}
+
+
+def lean_chrome_arguments() -> List[str]:
+    return ['--blink-settings=imagesEnabled=false']
+
+
+def apply_lean_render(driver) -> None:
+    """对当前标签页开启资源拦截"""
+    driver.execute_cdp_cmd('Network.enable', {})
+    driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': BLOCKED_RESOURCE_PATTERNS + BLOCKED_DOMAIN_PATTERNS})
+
+
+def page_stats(entries: List[dict]) -> Dict[str, object]:
+    """根据性能日志统计一个页面加载和拦截的请求"""
+    types: Dict[str, str] = {}
+    loaded_requests = 0
+    loaded_bytes = 0
+    blocked: Dict[str, int] = {}
+    for entry in entries:
+        message = json.loads(entry['message'])['message']
+        params = message.get('params', {})
+        method = message.get('method')
+        if method == 'Network.requestWillBeSent':
+            types[params['requestId']] = params.get('type', 'Other')
+        elif method == 'Network.loadingFinished':
+            loaded_requests += 1
+            loaded_bytes += int(params.get('encodedDataLength', 0))
+        elif method == 'Network.loadingFailed' and params.get('blockedReason'):
+            resource_type = params.get('type') or types.get(params['requestId'], 'Other')
+            blocked[resource_type] = blocked.get(resource_type, 0) + 1
+    saved_bytes = sum(TYPICAL_SIZE.get(t, 10 * 1024) * count for t, count in blocked.items())
+    return {
+        'loaded_requests': loaded_requests,
+        'loaded_bytes': loaded_bytes,
+        'blocked_requests': sum(blocked.values()),
+        'blocked_by_type': blocked,
+        'saved_bytes_estimate': saved_bytes,
+    }
+
+
+class LeanRenderStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.pages = 0
+        self.loaded_bytes = 0
+        self.blocked_requests = 0
+        self.saved_bytes_estimate = 0
+
+    def add(self, url: str, stats: Dict[str, object]) -> None:
+        print(f"精简加载 {url}: 下载 {stats['loaded_requests']} 个请求 {stats['loaded_bytes'] / 1024:.0f}KB，"
+              f"拦截 {stats['blocked_requests']} 个请求 {stats['blocked_by_type']}，"
+              f"约节省 {stats['saved_bytes_estimate'] / 1024:.0f}KB")
+        data_blocked = sum(stats['blocked_by_type'].get(t, 0) for t in DATA_REQUEST_TYPES)
+        if data_blocked:
+            print(f"警告: 精简加载拦截了 {url} 的 {data_blocked} 个数据请求，页面可能缺少游戏，请去掉 --lean 或检查拦截规则")
+        with self._lock:
+            self.pages += 1
+            self.loaded_bytes += stats['loaded_bytes']
+            self.blocked_requests += stats['blocked_requests']
+            self.saved_bytes_estimate += stats['saved_bytes_estimate']
+
+    def summary(self) -> str:
+        return (f"精简加载共 {self.pages} 个页面: 下载 {self.loaded_bytes / 2 ** 20:.1f}MB，"
+                f"拦截 {self.blocked_requests} 个请求，约节省 {self.saved_bytes_estimate / 2 ** 20:.1f}MB")
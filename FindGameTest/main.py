@@ -1,27 +1,48 @@
 import os
 import sys
 import time
-import random
+import argparse
+import threading
+import functools
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor
 from selenium import webdriver
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
 from bs4 import BeautifulSoup
 from datetime import datetime
 import re
-from ip_pool import IPPool
+from ip_pool import get_shared_pool
+from crawl_pool import CrawlPool
+from tab_pool import BACKGROUND_TAB_ARGS
+from page_ready import wait_for_app_rows
+import game_parser
+from crawl_state import CrawlState, fingerprint
+from checkpoint import CheckpointJournal
+from report import write_report
+from exporters import EXPORT_FORMATS, export_games
+from batch_engine import dedup_games, filter_sort_dedup
+from js_extract import detect_block_in_payload, extract_payload, games_from_payload
+from api_fetch import ApiFetcher, ApiRecorder, enable_network_capture, load_endpoints
+from hedging import HedgedFetcher
+from profile_cache import ProfileCache
+from retry_queue import DeadLetterFile
+from snapshot_archive import CODECS, SnapshotArchive, replay
+from lean_render import LeanRenderStats, apply_lean_render, lean_chrome_arguments, page_stats
+from metrics import get_metrics
+from rate_limiter import AdaptiveLimiter, BlockedError, backoff_delay, detect_block
 
 
 # 全局变量
 error_file_path = os.path.join(os.path.dirname(os.path.abspath(sys.argv[0])), 'error.txt')
 driver_path = None  # 将在main函数中初始化
+error_file_lock = threading.Lock()
 
 
 def log_error(message):
-    with open(error_file_path, 'a', encoding='utf-8') as f:
-        f.write(message + '\n')
+    with error_file_lock:
+        with open(error_file_path, 'a', encoding='utf-8') as f:
+            f.write(message + '\n')
 
 
 def clear_error_file():
@@ -69,8 +90,21 @@ def read_urls_from_file(file_path):
         return None, None, []
 
 
+# 执行 JavaScript 来隐藏自动化特征，新打开的标签页也需要执行
+def hide_automation(driver):
+    driver.execute_cdp_cmd('Page.addScriptToEvaluateOnNewDocument', {
+        'source': '''
+            Object.defineProperty(navigator, 'webdriver', {
+                get: () => undefined
+            })
+        '''
+    })
+
+
 # 初始化Selenium WebDriver
-def init_driver(driver_path):
+# profiles不为空时每个浏览器使用固定的缓存目录，静态文件在多次启动之间复用
+def init_driver(driver_path, proxy=None, capture_network=False, background_tabs=False, lean=False, profiles=None):
+    profile_dir = None
     try:
         options = Options()
         # 添加更多浏览器参数
@@ -80,31 +114,66 @@ def init_driver(driver_path):
         options.add_argument('--start-maximized')
         options.add_argument('--disable-web-security')  # 禁用同源策略
         options.add_argument('--ignore-certificate-errors')  # 忽略证书错误
+
+        # 多标签页模式下后台标签页也要全速渲染
+        if background_tabs:
+            for argument in BACKGROUND_TAB_ARGS:
+                options.add_argument(argument)
         
         # 添加实验性选项
         options.add_experimental_option('excludeSwitches', ['enable-automation'])
         options.add_experimental_option('useAutomationExtension', False)
+
+        # 精简加载：不显示图片
+        if lean:
+            for argument in lean_chrome_arguments():
+                options.add_argument(argument)
+
+        # 录制接口响应或统计精简加载效果时需要开启性能日志
+        if capture_network or lean:
+            enable_network_capture(options)
         
-        # 使用IP池
-        ip_pool = IPPool()
-        if proxy := ip_pool.get_random_ip():
+        # 使用IP池，未指定代理时随机选取
+        if proxy is None:
+            proxy = get_shared_pool().get_random_ip()
+        if proxy:
             options.add_argument(f'--proxy-server={proxy}')
             print(f"使用代理: {proxy}")
+
+        if profiles:
+            profile_dir = profiles.acquire()
+            for argument in profiles.chrome_arguments(profile_dir):
+                options.add_argument(argument)
         
         service = Service(driver_path)
-        driver = webdriver.Chrome(service=service, options=options)
+        try:
+            driver = webdriver.Chrome(service=service, options=options)
+        except Exception as e:
+            if profile_dir is None:
+                raise
+            # 缓存目录损坏时Chrome可能无法启动，清空后再试一次
+            print(f"使用缓存目录启动浏览器失败，清空后重试: {e}")
+            profiles.reset(profile_dir)
+            driver = webdriver.Chrome(service=Service(driver_path), options=options)
+        if profile_dir:
+            profiles.attach(driver, profile_dir)
         
-        # 执行 JavaScript 来隐藏自动化特征
-        driver.execute_cdp_cmd('Page.addScriptToEvaluateOnNewDocument', {
-            'source': '''
-                Object.defineProperty(navigator, 'webdriver', {
-                    get: () => undefined
-                })
-            '''
-        })
+        try:
+            hide_automation(driver)
+            if lean:
+                apply_lean_render(driver)
+        except Exception:
+            # 浏览器已经启动，先关闭再归还缓存目录，否则Chrome进程残留，目录仍被它锁定
+            try:
+                driver.quit()
+            except Exception:
+                pass
+            raise
         
         return driver
     except Exception as e:
+        if profile_dir:
+            profiles.release(profile_dir)
         error_message = f"Error initializing driver with path {driver_path}: {e}"
         log_error(error_message)
         print(error_message)
@@ -112,58 +181,106 @@ def init_driver(driver_path):
 
 
 # 请求网址获取内容
-def fetch_url_with_selenium(driver, url, retries=3):
-    global driver_path
-    try:
-        print(f"正在访问: {url}")
-        driver.get(url)
-        
-        # 先等待页面加载完成
-        WebDriverWait(driver, 30).until(
-            EC.presence_of_element_located((By.TAG_NAME, 'body'))
-        )
-        
-        # 等待一段随机时间
-        time.sleep(random.uniform(3, 5))
-        
-        # 尝试多个可能的元素
+# extract为js时在页面内提取游戏字段，返回JSON字符串而不是整个页面源码
+def fetch_url_with_selenium(session, url, retries=3, extract='html'):
+    metrics = get_metrics()
+    for attempt in range(retries + 1):
+        if session.cancelled:
+            return None
+        start = time.monotonic()
         try:
-            WebDriverWait(driver, 10).until(
-                EC.presence_of_element_located((By.CLASS_NAME, 'publisher-page'))
-            )
-        except:
-            try:
-                WebDriverWait(driver, 10).until(
-                    EC.presence_of_element_located((By.CLASS_NAME, 'content'))
-                )
-            except:
-                print("警告: 未找到特定元素，但页面已加载")
-        
-        print("页面内容长度:", len(driver.page_source))
-        return driver.page_source
-    except Exception as e:
-        if retries > 0:
-            driver.quit()
-            options = Options()
-            options.add_argument('--headless')
-            options.add_argument('--disable-gpu')
-            
-            if proxy := IPPool().get_random_ip():
-                options.add_argument(f'--proxy-server={proxy}')
-            
-            service = Service(driver_path)
-            driver = webdriver.Chrome(service=service, options=options)
-            
-            retry_message = f"Error fetching {url}. Retrying...{retries}"
+            driver = session.driver
+            if driver is None:
+                raise RuntimeError("浏览器启动失败")
+
+            print(f"正在访问: {url}")
+            with metrics.stage('navigate', url):
+                driver.get(url)
+
+            # 游戏行出现且数量稳定后立即返回，超时时间只作为上限
+            with metrics.stage('wait_ready', url):
+                ready = wait_for_app_rows(driver, timeout=30)
+            if ready['state'] == 'error':
+                raise RuntimeError(ready.get('error'))
+            if ready['state'] != 'ready':
+                print(f"警告: 页面状态 {ready['state']}，游戏行数 {ready['count']}")
+            print(f"页面就绪用时: {ready['elapsed']:.1f}s")
+
+            # 没有等到游戏行时检查是否出现了验证码或限流页面
+            if ready['state'] != 'ready':
+                block = detect_block(driver.page_source)
+                if block:
+                    raise BlockedError(f"页面被拦截: {block}")
+            with metrics.stage('page_source', url):
+                page_source = extract_payload(driver) if extract == 'js' else driver.page_source
+            print("页面内容长度:", len(page_source))
+            session.report(True, time.monotonic() - start)
+            metrics.record_page(url, status='ok', proxy=session.proxy, retries=attempt,
+                                page_bytes=len(page_source), app_rows=ready['count'], ready_state=ready['state'])
+            return page_source
+        except Exception as e:
+            if session.cancelled:
+                # 对冲请求已由另一个浏览器完成，浏览器被关闭导致的错误不计入代理评分
+                return None
+            blocked = isinstance(e, BlockedError)
+            session.report(False, blocked=blocked)
+            proxy = session.proxy
+            # 浏览器仍然可用且不是网络/代理错误时直接重试，否则换代理重启浏览器；被拦截时也换代理
+            # 最后一次失败也重启，下一个网址(或延迟重试)不再使用出错的浏览器和代理
+            restart = blocked or not session.is_healthy() or 'net::ERR' in str(e)
+            restarted = restart and session.restart()
+            if attempt == retries:
+                error_message = f"Error fetching {url} with Selenium after retries: {e}"
+                log_error(error_message)
+                print(error_message)
+                metrics.record_page(url, status='failed', proxy=proxy, retries=attempt, error=str(e))
+                return None
+            metrics.count('retry')
+
+            if restart:
+                if not restarted:
+                    error_message = f"Error fetching {url}: restart budget exhausted: {e}"
+                    log_error(error_message)
+                    print(error_message)
+                    metrics.record_page(url, status='failed', proxy=proxy, retries=attempt, error=str(e))
+                    return None
+
+            retry_message = f"Error fetching {url}. Retrying...{retries - attempt}"
             log_error(retry_message)
             print(retry_message)
-            time.sleep(random.uniform(3, 6))
-            return fetch_url_with_selenium(driver, url, retries - 1)
-        else:
-            error_message = f"Error fetching {url} with Selenium after retries: {e}"
-            log_error(error_message)
-            print(error_message)
+            # 指数退避：第一次重试等待3~6秒，之后每次翻倍，最多60秒
+            time.sleep(backoff_delay(attempt, 6, 60))
+
+
+# 不经过浏览器，直接请求已录制的接口获取游戏信息
+def fetch_games_with_api(urls, endpoints_file, workers, ip_pool=None, limiter=None):
+    fetcher = ApiFetcher(load_endpoints(endpoints_file), pool_size=max(workers, 1), ip_pool=ip_pool, limiter=limiter)
+    api_urls = [url for url in urls if fetcher.can_fetch(url)]
+    results = {}
+    with ThreadPoolExecutor(max_workers=max(workers, 1)) as executor:
+        for url, games in zip(api_urls, executor.map(fetcher.fetch_games, api_urls)):
+            if games is not None:
+                print(f"接口获取 {len(games)} 个游戏: {url}")
+                results[url] = games
+            else:
+                log_error(f"Error fetching {url} via API, falling back to browser")
+    return results
+
+
+# 增量模式的轻量检查：有录制接口的网址直接请求接口计算游戏列表指纹
+def make_api_probe(endpoints_file, ip_pool=None, limiter=None):
+    endpoints = load_endpoints(endpoints_file)
+    if not endpoints:
+        return None
+    fetcher = ApiFetcher(endpoints, ip_pool=ip_pool, limiter=limiter)
+
+    def probe(url):
+        if not fetcher.can_fetch(url):
             return None
+        games = fetcher.fetch_games(url)
+        return fingerprint(games) if games else None
+
+    return probe
 
 
 # 提取单个游戏的信息
@@ -201,7 +318,10 @@ def extract_game_info(row, source_url, company_name):
 
 
 # 提取所有游戏的信息
-def extract_all_game_info(html, source_url):
+def extract_all_game_info(html, source_url, backend='bs4'):
+    if backend == 'lxml' and game_parser.lxml_available():
+        return game_parser.extract_all_game_info(html, source_url)
+
     soup = BeautifulSoup(html, 'html.parser')
 
     # 提取公司名称
@@ -221,52 +341,136 @@ def extract_all_game_info(html, source_url):
     return games
 
 
-# 过滤和排序游戏信息
-def filter_and_sort_games(games, cutoff_date):
-    filtered_games = []
+# 过滤游戏信息，只保留截止日期之后的游戏
+def filter_games(games, cutoff_date, sort=False):
+    def on_error(game, e):
+        error_message = f"Error parsing date for game {game['name']}: {e}"
+        log_error(error_message)
+        print(error_message)
 
-    for game in games:
-        try:
-            release_date = datetime.strptime(game['release_date'], '%d-%m-%Y')
-            if release_date > cutoff_date:
-                game['parsed_date'] = release_date
-                filtered_games.append(game)
-        except Exception as e:
-            error_message = f"Error parsing date for game {game['name']}: {e}"
-            log_error(error_message)
-            print(error_message)
+    # 批量解析日期，安装了pandas时按不同日期分组一次解析
+    return filter_sort_dedup(games, cutoff_date, '%d-%m-%Y', on_error=on_error, sort=sort)
 
-    # 按日期倒序排序
-    filtered_games.sort(key=lambda x: x['parsed_date'], reverse=True)
 
-    return filtered_games
+# 过滤和排序游戏信息
+def filter_and_sort_games(games, cutoff_date):
+    # 按日期倒序排序
+    return filter_games(games, cutoff_date, sort=True)
 
 
 # 生成新的HTML文件
-def generate_html_file(games, output_file):
+# 游戏数超过page_size时分页输出，output_file为目录页
+def generate_html_file(games, output_file, page_size=2000, split='page'):
     try:
-        with open(output_file, 'w', encoding='utf-8') as file:
-            file.write('<html><head><title>数据分析</title></head><body>\n')
-            file.write('<h1>数据分析</h1>\n')
-            file.write('<table border="1">\n')
-            file.write('<tr><th>图标</th><th>游戏名</th><th>发布日期</th><th>国家</th><th>所属公司</th></tr>\n')
-            for game in games:
-                file.write(
-                    f"<tr><td><img src='{game['image_url']}' alt='Game Image' height='32px' width='32px'></td>\n"
-                    f"<td><a href='{game['url']}'>{game['name']}</a></td>\n"
-                    f"<td>{game['release_date']}</td>\n"
-                    f"<td>{game['countries']}</td>\n"
-                    f"<td><a href='{game['source_url']}'>{game['company_name']}</a></td></tr>\n"
-                )
-            file.write('</table>\n')
-            file.write('</body></html>\n')
+        files = write_report(games, output_file, page_size, split)
+        if len(files) > 1:
+            print(f"结果共 {len(games)} 个游戏，分为 {len(files) - 1} 页")
     except Exception as e:
         error_message = f"Error writing to file {output_file}: {e}"
         log_error(error_message)
         print(error_message)
 
 
+# 解析命令行参数
+def parse_args():
+    parser = argparse.ArgumentParser(description='FindGame')
+    parser.add_argument('--workers', type=int, default=1, help='同时运行的浏览器数量')
+    parser.add_argument('--per-host', type=int, default=None, help='同一主机的最大并发数，默认不超过workers')
+    parser.add_argument('--host-interval', type=float, default=0.5, help='同一主机两次请求之间的最小间隔(秒)')
+    parser.add_argument('--proxy-test-url', default='https://www.baidu.com', help='测试代理是否可用的网址')
+    parser.add_argument('--tabs', type=int, default=1, help='每个浏览器同时加载的标签页数量')
+    parser.add_argument('--parse-workers', type=int, default=0,
+                        help='解析进程数，大于0时抓取和解析同时进行，0表示抓取完一个页面后直接解析')
+    parser.add_argument('--parser', choices=['bs4', 'lxml'], default='bs4', help='页面解析方式，lxml更快')
+    parser.add_argument('--extract', choices=['html', 'js'], default='html',
+                        help='js: 在页面内直接提取游戏字段，只传回很小的JSON，不再传回和解析整个页面')
+    parser.add_argument('--backend', choices=['selenium', 'api'], default='selenium',
+                        help='api: 对已录制接口的网址直接请求接口，其余网址仍使用浏览器')
+    parser.add_argument('--incremental', action='store_true',
+                        help='增量模式：只抓取到期或有变化的公司页面，只输出新出现的游戏')
+    parser.add_argument('--recrawl-hours', type=float, default=24, help='增量模式下同一网址两次抓取的最小间隔(小时)')
+    parser.add_argument('--record-api', action='store_true', help='浏览器抓取时录制页面的接口响应，供api模式使用')
+    parser.add_argument('--lean', action='store_true', help='精简加载：拦截图片、字体、样式和第三方统计脚本')
+    parser.add_argument('--page-size', type=int, default=2000, help='结果网页每页的游戏数，0表示不分页')
+    parser.add_argument('--split', choices=['page', 'month'], default='page',
+                        help='分页方式：page 按 --page-size 分页，month 按发布月份分页')
+    parser.add_argument('--export', nargs='+', choices=EXPORT_FORMATS, default=[],
+                        help='同时把结果导出为 jsonl/csv/parquet，文件名与结果网页相同')
+    parser.add_argument('--dedup', action='store_true', help='多个公司页面中同名同日期的游戏只保留一个')
+    parser.add_argument('--resume', action='store_true',
+                        help='从上次中断的位置继续：跳过 checkpoint.jsonl 中已完成的网址，直接使用记录的结果')
+    parser.add_argument('--hedge', action='store_true',
+                        help='页面超过最近加载耗时的百分位数仍未完成时，用另一个代理同时请求，先完成的为准')
+    parser.add_argument('--hedge-percentile', type=float, default=90, help='触发对冲请求的加载耗时百分位数')
+    parser.add_argument('--url-deadline', type=float, default=120, help='对冲模式下每个网址的最长耗时(秒)')
+    parser.add_argument('--retries', type=int, default=3,
+                        help='失败的网址放到最后延迟重试的次数，用完后记录到 dead_letter.jsonl')
+    parser.add_argument('--retry-delay', type=float, default=30, help='第一次延迟重试前的等待时间(秒)，之后逐次翻倍')
+    parser.add_argument('--reseed', action='store_true', help='优先重新抓取 dead_letter.jsonl 中上次失败的网址')
+    parser.add_argument('--profile-dir', default=None,
+                        help='浏览器缓存目录，每个浏览器一个子目录，多次运行之间复用网站的JS、字体等文件')
+    parser.add_argument('--profile-mode', choices=['cache', 'profile'], default='cache',
+                        help='cache只复用磁盘缓存；profile复用整个用户数据目录(包括cookie)')
+    parser.add_argument('--cache-size', type=int, default=300, help='每个浏览器缓存目录的大小上限(MB)')
+    parser.add_argument('--archive', action='store_true',
+                        help='把取回的页面压缩保存到快照目录，相同内容只存一份，页面结构变化后可用 --replay 重新解析')
+    parser.add_argument('--archive-dir', default='snapshots', help='页面快照目录')
+    parser.add_argument('--archive-codec', choices=('auto',) + CODECS, default='auto',
+                        help='快照压缩方式，auto在安装了zstandard时用zst，否则用gz')
+    parser.add_argument('--replay', action='store_true',
+                        help='不启动浏览器，用多个进程重新解析快照目录中每个网址最新的页面并生成结果')
+    parser.add_argument('--replay-since', default=None, help='只使用这天(YYYY-MM-DD)之后保存的快照')
+    parser.add_argument('--replay-run', default=None,
+                        help='只使用某一次运行保存的快照，值为运行开始时间(见 snapshots/index.jsonl 的 run)；'
+                             '不指定时每个网址使用最新的快照')
+    parser.add_argument('--metrics-file', default='metrics.jsonl', help='运行结束时追加写入各阶段耗时的JSON行文件')
+    parser.add_argument('--prometheus-file', default=None, help='同时写入Prometheus文本格式的指标文件')
+    return parser.parse_args()
+
+
+def write_results(games, output_file, args):
+    """对过滤后的游戏去重、排序，生成网页并导出"""
+    metrics = get_metrics()
+    # 按日期倒序排序
+    with metrics.stage('sort'):
+        if args.dedup:
+            games = dedup_games(games)
+        games.sort(key=lambda x: x['parsed_date'], reverse=True)
+    with metrics.stage('generate_html'):
+        generate_html_file(games, output_file, args.page_size, args.split)
+    print(f"Generated HTML file: {output_file}")
+    if args.export:
+        with metrics.stage('export'):
+            export_games(games, output_file, args.export)
+
+
+def replay_snapshots(args, archive, urls, cutoff_date, output_file):
+    """不启动浏览器，重新解析快照中urls.txt里每个网址最新的页面，或 --replay-run 指定的那次运行的页面"""
+    metrics = get_metrics()
+    entries = archive.latest(since=args.replay_since, urls=urls, run=args.replay_run)
+    if args.replay_run and not entries:
+        runs = archive.runs()
+        print(f"快照中没有运行 {args.replay_run}，可用的运行: " +
+              (', '.join(f"{run}({count}个页面)" for run, count in runs.items()) or '无'))
+        return
+    print(f"从快照重新解析 {len(entries)}/{len(urls)} 个网址")
+    parsers = {
+        'html': functools.partial(extract_all_game_info, backend=args.parser),
+        'js': games_from_payload,
+    }
+    with metrics.stage('replay'):
+        results = replay(archive, entries, parsers, args.parse_workers)
+    games = []
+    for url, found in results:
+        metrics.record_page(url, status='ok', backend='replay', games_found=len(found))
+        with metrics.stage('filter'):
+            games.extend(filter_games(found, cutoff_date))
+    write_results(games, output_file, args)
+
+
 def main():
+    args = parse_args()
+
     # 清理旧的错误文件
     clear_error_file()
 
@@ -276,30 +480,205 @@ def main():
     file_path = os.path.join(base_dir, 'urls.txt')  # 包含驱动路径、截止日期和网址的txt文件路径
     output_file = os.path.join(base_dir, 'FindGame.html')  # 生成的HTML文件路径
 
+    global driver_path
     driver_path, cutoff_date, urls = read_urls_from_file(file_path)
     if driver_path is None or cutoff_date is None:
         print(f"Invalid input file format. Please ensure the file starts with driver path and cutoff date in the correct format.")
         return
 
-    driver = init_driver(driver_path)
-    if not driver:
-        print(f"Failed to initialize web driver.")
+    if args.parser == 'lxml' and not game_parser.lxml_available():
+        print("未安装lxml，使用BeautifulSoup解析")
+
+    # 性能日志是整个浏览器共用的，接口响应只能在发出请求的标签页里读取，多标签页时无法按网址录制
+    if args.record_api and args.tabs > 1:
+        print("--record-api 只支持每个浏览器一个标签页，请去掉 --tabs 或设为 1")
         return
 
-    games = []
-    try:
-        for i, url in enumerate(urls):
-            html = fetch_url_with_selenium(driver, url)
-            if html:
-                game_info_list = extract_all_game_info(html, url)
-                games.extend(game_info_list)
-                print(f"Processed {i + 1}/{len(urls)}: {url}")  # 显示进度
-    finally:
-        driver.quit()
-
-    filtered_and_sorted_games = filter_and_sort_games(games, cutoff_date)
-    generate_html_file(filtered_and_sorted_games, output_file)
-    print(f"Generated HTML file: {output_file}")
+    metrics = get_metrics()
+    archive = None
+    if args.archive or args.replay:
+        archive = SnapshotArchive(os.path.join(base_dir, args.archive_dir), args.archive_codec)
+
+    if args.replay:
+        replay_snapshots(args, archive, urls, cutoff_date, output_file)
+        print(metrics.report())
+        metrics.write_jsonl(os.path.join(base_dir, args.metrics_file))
+        return
+
+    # 整个进程只测试一次代理
+    with metrics.stage('proxy_validation'):
+        ip_pool = get_shared_pool(test_url=args.proxy_test_url)
+
+    endpoints_file = os.path.join(base_dir, 'api_endpoints.json')
+    # 直接请求接口时与浏览器一样换代理、按主机限制并发和退避
+    api_limiter = AdaptiveLimiter(args.per_host or args.workers, args.host_interval)
+
+    # 重试次数用完的网址记录在这里，--reseed 时排在最前面抓取，不受 --incremental 的间隔限制
+    dead_letters = DeadLetterFile(os.path.join(base_dir, 'dead_letter.jsonl'))
+    reseed = list(dead_letters.load()) if args.reseed else []
+    if args.reseed:
+        print(f"从 dead_letter.jsonl 重新抓取 {len(reseed)} 个网址")
+    file_urls = urls
+
+    state = None
+    if args.incremental:
+        state = CrawlState(os.path.join(base_dir, 'crawl_state.json'), args.recrawl_hours)
+        urls = state.select(urls, make_api_probe(endpoints_file, ip_pool, api_limiter))
+
+    # 每个页面的结果一解析完就过滤，最后只对过滤后的游戏排序；
+    # 检查点、接口和浏览器取得的结果都按网址在 urls.txt 中的位置合并，与逐个抓取的顺序相同
+    filtered_by_page = {}
+    url_order = {}
+    for position, url in enumerate(file_urls + reseed):
+        url_order.setdefault(url, position)
+    if reseed:
+        seeded = set(reseed)
+        urls = reseed + [url for url in urls if url not in seeded]
+    succeeded = set()
+
+    # 每个网址解析完立即写入检查点，中断后用 --resume 继续
+    journal = CheckpointJournal(os.path.join(base_dir, 'checkpoint.jsonl'))
+    completed = journal.load() if args.resume else {}
+    journal.open(resume=args.resume)
+
+    def collect(group, index, url, games, record=True):
+        succeeded.add(url)
+        if record:
+            journal.record(url, games)
+        metrics.record_page(url, games_found=len(games))
+        if state is not None:
+            games = state.update(url, games)
+        with metrics.stage('filter'):
+            filtered_by_page[(url_order[url], group, index)] = filter_games(games, cutoff_date)
+
+    if completed:
+        print(f"从检查点恢复 {sum(url in completed for url in urls)}/{len(urls)} 个已完成的网址")
+        for index, url in enumerate(urls):
+            if url in completed:
+                collect(-1, index, url, completed[url], record=False)
+        urls = [url for url in urls if url not in completed]
+
+    if args.backend == 'api':
+        with metrics.stage('api_fetch'):
+            api_results = fetch_games_with_api(urls, endpoints_file, args.workers, ip_pool, api_limiter)
+        for index, url in enumerate(urls):
+            if url in api_results:
+                metrics.record_page(url, status='ok', backend='api')
+                collect(0, index, url, api_results[url])
+        urls = [url for url in urls if url not in api_results]
+
+    # 失败的网址不在原地重试，由 CrawlPool 延迟后换代理重试
+    fetch = functools.partial(fetch_url_with_selenium, retries=0, extract=args.extract)
+    if args.extract == 'js':
+        parse = games_from_payload
+    else:
+        parse = functools.partial(extract_all_game_info, backend=args.parser)
+    recorder = ApiRecorder(os.path.join(base_dir, 'api_fixtures'), endpoints_file) if args.record_api else None
+    lean_stats = LeanRenderStats() if args.lean else None
+    if recorder or lean_stats:
+        def fetch(session, url):
+            html = fetch_url_with_selenium(session, url, retries=0, extract=args.extract)
+            if not html:
+                return html
+            # 性能日志读取一次后就清空了，录制接口和统计流量共用同一份
+            try:
+                entries = session.driver.get_log('performance')
+            except Exception as e:
+                log_error(f"Error reading performance log for {url}: {e}")
+                return html
+            if lean_stats:
+                lean_stats.add(url, page_stats(entries))
+            if recorder:
+                try:
+                    recorder.record(session.driver, url, entries)
+                except Exception as e:
+                    log_error(f"Error recording API responses for {url}: {e}")
+            return html
+
+    # 多标签页时不经过上面的 fetch，取回页面后在 harvest 里读出性能日志，否则日志一直积累；
+    # 读出的是上次读取之后所有标签页的请求，合计的流量仍然准确
+    harvest = extract_payload if args.extract == 'js' else None
+    if lean_stats and args.tabs > 1:
+        extract_content = harvest
+
+        def harvest(driver):
+            content = extract_content(driver) if extract_content else driver.page_source
+            try:
+                entries = driver.get_log('performance')
+            except Exception as e:
+                log_error(f"Error reading performance log for {driver.current_url}: {e}")
+                return content
+            lean_stats.add(driver.current_url, page_stats(entries))
+            return content
+
+    def prepare_tab(driver):
+        hide_automation(driver)
+        if args.lean:
+            apply_lean_render(driver)
+
+    profiles = None
+    if args.profile_dir:
+        profiles = ProfileCache(os.path.join(base_dir, args.profile_dir), args.profile_mode, args.cache_size)
+
+    def create_driver(proxy):
+        return init_driver(driver_path, proxy, capture_network=args.record_api,
+                           background_tabs=args.tabs > 1, lean=args.lean, profiles=profiles)
+
+    # 对冲请求只用于每个浏览器一个标签页的模式，多标签页时各标签页本身就互不等待
+    hedger = None
+    if args.hedge:
+        if args.tabs > 1:
+            print("多标签页模式不使用对冲请求")
+        else:
+            hedger = HedgedFetcher(fetch, create_driver, ip_pool, args.hedge_percentile, args.url_deadline)
+            fetch = hedger
+
+    pool = CrawlPool(
+        create_driver=create_driver,
+        fetch=fetch,
+        parse=parse,
+        concurrency=args.workers,
+        max_per_host=args.per_host,
+        min_interval=args.host_interval,
+        ip_pool=ip_pool,
+        parse_workers=args.parse_workers,
+        tabs=args.tabs,
+        prepare_tab=prepare_tab,
+        harvest=harvest,
+        detect_block=detect_block_in_payload if args.extract == 'js' else detect_block,
+        max_retries=args.retries,
+        retry_delay=args.retry_delay,
+        on_html=(lambda url, html: archive.save(url, html, args.extract)) if args.archive else None,
+    )
+    with metrics.stage('crawl'):
+        pool.run(urls, on_games=lambda index, url, games: collect(1, index, url, games))
+    if hedger:
+        hedger.close()
+    if profiles and profiles.report():
+        print(profiles.report())
+    if args.archive:
+        print(archive.summary())
+    remaining = dead_letters.update(succeeded, pool.dead)
+    if remaining:
+        print(f"{remaining} 个网址多次重试仍失败，已记录到 dead_letter.jsonl，下次可用 --reseed 重新抓取")
+    if lean_stats and lean_stats.pages:
+        print(lean_stats.summary())
+
+    filtered_and_sorted_games = []
+    for key in sorted(filtered_by_page):
+        filtered_and_sorted_games.extend(filtered_by_page[key])
+    write_results(filtered_and_sorted_games, output_file, args)
+    # 结果写入成功后才保存抓取状态，否则下次增量运行会认为这些页面没有变化而跳过，新游戏不会出现在结果中
+    if state is not None:
+        state.save()
+    # 结果已经写入网页，检查点不再需要
+    journal.close(remove=True)
+
+    # 输出各阶段耗时，便于找出瓶颈和对比多次运行
+    print(metrics.report())
+    metrics.write_jsonl(os.path.join(base_dir, args.metrics_file))
+    if args.prometheus_file:
+        metrics.write_prometheus(os.path.join(base_dir, args.prometheus_file))
 
     # 检查错误文件是否存在，如果没有错误，删除该文件
     if not os.path.exists(error_file_path) or os.stat(error_file_path).st_size == 0:
@@ -307,4 +686,5 @@ def main():
 
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    multiprocessing.freeze_support()
+    main()
@@ -0,0 +1,141 @@
+import json
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional
+
+
+def _percentile(values: List[float], percent: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(percent / 100 * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+class RunMetrics:
+    """记录一次运行中每个阶段、每个网址的耗时和结果，结束时输出JSON行或Prometheus文本"""
+
+    def __init__(self):
+        self.run_id = datetime.now().strftime('%Y%m%d-%H%M%S')
+        self.started = time.time()
+        self._start = time.monotonic()
+        self._lock = threading.Lock()
+        self.stages: Dict[str, List[float]] = {}
+        self.counters: Dict[str, int] = {}
+        self.pages: Dict[str, dict] = {}
+
+    @contextmanager
+    def stage(self, name: str, url: Optional[str] = None) -> Iterator[None]:
+        """计时一个阶段，出现异常时也会记录耗时"""
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self.observe(name, time.monotonic() - start, url)
+
+    def observe(self, name: str, seconds: float, url: Optional[str] = None) -> None:
+        with self._lock:
+            self.stages.setdefault(name, []).append(seconds)
+            if url is not None:
+                page = self.pages.setdefault(url, {'url': url})
+                page.setdefault('stages', {})
+                page['stages'][name] = round(page['stages'].get(name, 0.0) + seconds, 4)
+
+    def count(self, name: str, n: int = 1) -> None:
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def record_page(self, url: str, **fields) -> None:
+        """记录网址的代理、重试次数、页面大小、游戏行数等信息"""
+        with self._lock:
+            self.pages.setdefault(url, {'url': url}).update(fields)
+
+    def stage_summary(self) -> Dict[str, dict]:
+        with self._lock:
+            stages = {name: list(values) for name, values in self.stages.items()}
+        summary = {}
+        for name, values in stages.items():
+            summary[name] = {
+                'count': len(values),
+                'total': round(sum(values), 4),
+                'mean': round(sum(values) / len(values), 4),
+                'p50': round(_percentile(values, 50), 4),
+                'p95': round(_percentile(values, 95), 4),
+                'max': round(max(values), 4),
+            }
+        return summary
+
+    def _run_record(self) -> dict:
+        with self._lock:
+            pages = list(self.pages.values())
+            counters = dict(self.counters)
+        return {
+            'type': 'run',
+            'run_id': self.run_id,
+            'started': datetime.fromtimestamp(self.started).isoformat(timespec='seconds'),
+            'elapsed': round(time.monotonic() - self._start, 4),
+            'pages': len(pages),
+            'pages_ok': sum(1 for page in pages if page.get('status') == 'ok'),
+            'counters': counters,
+        }
+
+    def write_jsonl(self, path: str) -> None:
+        """追加写入本次运行的汇总、各阶段统计和每个网址的记录，多次运行可放在同一个文件中对比"""
+        lines = [self._run_record()]
+        for name, stats in self.stage_summary().items():
+            lines.append({'type': 'stage', 'run_id': self.run_id, 'stage': name, **stats})
+        with self._lock:
+            pages = [dict(page) for page in self.pages.values()]
+        for page in pages:
+            lines.append({'type': 'page', 'run_id': self.run_id, **page})
+        with open(path, 'a', encoding='utf-8') as f:
+            for line in lines:
+                f.write(json.dumps(line, ensure_ascii=False) + '\n')
+
+    def write_prometheus(self, path: str) -> None:
+        """写入Prometheus文本格式，可由node_exporter的textfile收集"""
+        run = self._run_record()
+        out = [
+            '# HELP findgame_stage_seconds Duration of each crawl stage.',
+            '# TYPE findgame_stage_seconds summary',
+        ]
+        for name, stats in self.stage_summary().items():
+            out.append(f'findgame_stage_seconds{{stage="{name}",quantile="0.5"}} {stats["p50"]}')
+            out.append(f'findgame_stage_seconds{{stage="{name}",quantile="0.95"}} {stats["p95"]}')
+            out.append(f'findgame_stage_seconds_sum{{stage="{name}"}} {stats["total"]}')
+            out.append(f'findgame_stage_seconds_count{{stage="{name}"}} {stats["count"]}')
+        out.append('# HELP findgame_events_total Number of retries, restarts and other events.')
+        out.append('# TYPE findgame_events_total counter')
+        for name, value in sorted(run['counters'].items()):
+            out.append(f'findgame_events_total{{event="{name}"}} {value}')
+        out.append('# TYPE findgame_pages gauge')
+        out.append(f'findgame_pages{{status="ok"}} {run["pages_ok"]}')
+        out.append(f'findgame_pages{{status="failed"}} {run["pages"] - run["pages_ok"]}')
+        out.append('# TYPE findgame_run_seconds gauge')
+        out.append(f'findgame_run_seconds {run["elapsed"]}')
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write('\n'.join(out) + '\n')
+
+    def report(self) -> str:
+        """按总耗时从高到低列出各阶段"""
+        lines = [f"总用时 {time.monotonic() - self._start:.1f}s"]
+        summary = sorted(self.stage_summary().items(), key=lambda item: item[1]['total'], reverse=True)
+        for name, stats in summary:
+            lines.append(f"  {name}: 共 {stats['total']:.2f}s, {stats['count']} 次, "
+                         f"平均 {stats['mean']:.2f}s, p95 {stats['p95']:.2f}s")
+        if self.counters:
+            lines.append(f"  事件: {self.counters}")
+        return '\n'.join(lines)
+
+
+_shared_metrics: Optional[RunMetrics] = None
+_shared_metrics_lock = threading.Lock()
+
+
+def get_metrics() -> RunMetrics:
+    """整个进程共用一个指标记录对象"""
+    global _shared_metrics
+    with _shared_metrics_lock:
+        if _shared_metrics is None:
+            _shared_metrics = RunMetrics()
+        return _shared_metrics
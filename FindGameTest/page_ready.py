@@ -0,0 +1,49 @@
+import time
+
+APP_ROW_SELECTOR = 'publisher-app-row[class*="g-item"][class*="parent-app-info-hover"]'
+
+# 在页面中监听DOM变化：游戏行出现且数量在settle毫秒内不再变化即视为就绪，
+# 只有公司名称没有游戏行时，超过emptyGrace毫秒视为空页面，timeout只作为上限
+_WAIT_SCRIPT = '''
+var selector = arguments[0], settleMs = arguments[1], emptyGraceMs = arguments[2], timeoutMs = arguments[3];
+var callback = arguments[arguments.length - 1];
+var start = Date.now(), lastCount = -1, lastChange = start, nameSeen = 0, done = false, observer, timer;
+function finish(state) {
+    if (done) return;
+    done = true;
+    if (observer) observer.disconnect();
+    clearInterval(timer);
+    callback({state: state, count: lastCount});
+}
+function check() {
+    if (done) return;
+    var now = Date.now();
+    var count = document.querySelectorAll(selector).length;
+    if (count !== lastCount) { lastCount = count; lastChange = now; }
+    if (!nameSeen && document.querySelector('.publisher-name')) nameSeen = now;
+    if (count > 0 && now - lastChange >= settleMs) return finish('ready');
+    if (count === 0 && nameSeen && now - nameSeen >= emptyGraceMs) return finish('empty');
+    if (now - start >= timeoutMs) finish('timeout');
+}
+observer = new MutationObserver(check);
+observer.observe(document.documentElement, {childList: true, subtree: true});
+timer = setInterval(check, 100);
+check();
+'''
+
+
+def wait_for_app_rows(driver, timeout: float = 30.0, settle: float = 0.8, empty_grace: float = 5.0) -> dict:
+    """等待游戏行加载完成，返回 {'state', 'count', 'elapsed'}
+
+    state 为 ready(游戏行已稳定)、empty(公司页面没有游戏)、timeout 或 error
+    """
+    start = time.monotonic()
+    try:
+        driver.set_script_timeout(timeout + 5)
+        result = driver.execute_async_script(
+            _WAIT_SCRIPT, APP_ROW_SELECTOR, int(settle * 1000), int(empty_grace * 1000), int(timeout * 1000)
+        ) or {}
+    except Exception as e:
+        result = {'state': 'error', 'count': 0, 'error': str(e)}
+    result['elapsed'] = time.monotonic() - start
+    return result
@@ -0,0 +1,71 @@
+import queue
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, List, Optional
+
+from metrics import get_metrics
+
+
+class ParsePipeline:
+    def __init__(self,
+                 parse: Callable[[str, str], List[dict]],
+                 on_result: Callable[[int, str, List[dict]], None],
+                 workers: int = 2,
+                 queue_size: int = 4,
+                 use_processes: bool = True,
+                 on_error: Optional[Callable[[int, str, Exception], None]] = None):
+        self.parse = parse
+        self.on_result = on_result
+        # 解析出错时调用；不提供时按没有游戏处理
+        self.on_error = on_error
+        self.workers = max(1, workers)
+        # 有界队列：解析跟不上时抓取线程会在put处等待，内存中最多只有 queue_size + workers 个页面
+        self.queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self.executor: Optional[ProcessPoolExecutor] = ProcessPoolExecutor(self.workers) if use_processes else None
+        self._lock = threading.Lock()
+        self._threads = [threading.Thread(target=self._consume, daemon=True) for _ in range(self.workers)]
+        for thread in self._threads:
+            thread.start()
+
+    def put(self, index: int, url: str, html: str) -> None:
+        """提交一个待解析的页面，队列满时阻塞"""
+        self.queue.put((index, url, html))
+
+    def _consume(self) -> None:
+        while True:
+            item = self.queue.get()
+            if item is None:
+                return
+            index, url, html = item
+            error = None
+            try:
+                # 每个解析进程对应一个消费线程，这里的耗时基本就是解析耗时
+                with get_metrics().stage('parse', url):
+                    if self.executor is not None:
+                        games = self.executor.submit(self.parse, html, url).result()
+                    else:
+                        games = self.parse(html, url)
+            except Exception as e:
+                print(f"解析 {url} 出错: {e}")
+                error, games = e, []
+            del html, item
+            with self._lock:
+                if error is not None and self.on_error is not None:
+                    self.on_error(index, url, error)
+                else:
+                    self.on_result(index, url, games)
+
+    def close(self) -> None:
+        """等待队列中的页面全部解析完成"""
+        for _ in self._threads:
+            self.queue.put(None)
+        for thread in self._threads:
+            thread.join()
+        if self.executor is not None:
+            self.executor.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,115 @@
+import json
+import os
+import shutil
+import threading
+from typing import Dict, List, Optional, Set
+
+# Chrome正常退出时会删除这些锁文件，残留说明上次浏览器崩溃或被强制关闭
+_LOCK_FILES = ('SingletonLock', 'SingletonSocket', 'SingletonCookie', 'lockfile')
+# 配置文件无法解析时Chrome会报错或丢弃整个配置
+_PREFERENCE_FILES = (os.path.join('Default', 'Preferences'), 'Local State')
+
+
+def _dir_size(path: str) -> int:
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.lstat(os.path.join(root, name)).st_size
+            except OSError:
+                pass
+    return total
+
+
+class ProfileCache:
+    """每个浏览器固定使用一个目录，多次启动和多次运行之间复用网站的JS、字体等静态文件缓存
+
+    mode 为 cache 时只复用磁盘缓存，cookie等仍是临时的(换代理后不带着旧的登录状态)；
+    为 profile 时复用整个用户数据目录。同时运行的浏览器各用一个目录，目录名为 slot-序号
+    """
+
+    def __init__(self, root: str, mode: str = 'cache', max_cache_mb: int = 300):
+        self.root = root
+        self.mode = mode
+        self.max_bytes = max_cache_mb * 2 ** 20
+        self._in_use: Set[str] = set()
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+
+    def acquire(self) -> str:
+        """取一个没有被其他浏览器使用的目录，每次使用前检查是否损坏或超出大小"""
+        with self._lock:
+            index = 0
+            while os.path.join(self.root, f'slot-{index}') in self._in_use:
+                index += 1
+            path = os.path.join(self.root, f'slot-{index}')
+            self._in_use.add(path)
+        self._check(path)
+        return path
+
+    def release(self, path: str) -> None:
+        with self._lock:
+            self._in_use.discard(path)
+
+    def _check(self, path: str) -> None:
+        if not os.path.isdir(path):
+            return
+        if self.mode == 'profile':
+            for name in _LOCK_FILES:
+                lock = os.path.join(path, name)
+                if os.path.lexists(lock):
+                    os.remove(lock)
+            for name in _PREFERENCE_FILES:
+                preferences = os.path.join(path, name)
+                if not os.path.exists(preferences):
+                    continue
+                try:
+                    with open(preferences, 'r', encoding='utf-8') as f:
+                        json.load(f)
+                except (OSError, ValueError):
+                    print(f"浏览器配置已损坏，清空: {path}")
+                    self.reset(path)
+                    return
+        # Chrome按 --disk-cache-size 限制缓存，这里再限制整个目录，避免日志、崩溃报告等越积越多
+        size = _dir_size(path)
+        if size > self.max_bytes * 2:
+            print(f"浏览器缓存 {size / 2 ** 20:.0f}MB 超出上限，清空: {path}")
+            self.reset(path)
+
+    def reset(self, path: str) -> None:
+        """删除目录，下次启动时重新创建"""
+        shutil.rmtree(path, ignore_errors=True)
+
+    def chrome_arguments(self, path: str) -> List[str]:
+        arguments = [f'--disk-cache-size={self.max_bytes}']
+        if self.mode == 'profile':
+            arguments.append(f'--user-data-dir={path}')
+        else:
+            arguments.append(f"--disk-cache-dir={os.path.join(path, 'cache')}")
+        return arguments
+
+    def attach(self, driver, path: str) -> None:
+        """浏览器关闭后自动归还目录"""
+        quit_driver = driver.quit
+
+        def quit():
+            try:
+                quit_driver()
+            finally:
+                self.release(path)
+
+        driver.quit = quit
+
+    def sizes(self) -> Dict[str, int]:
+        """每个目录当前占用的字节数"""
+        if not os.path.isdir(self.root):
+            return {}
+        return {name: _dir_size(os.path.join(self.root, name))
+                for name in sorted(os.listdir(self.root)) if name.startswith('slot-')}
+
+    def report(self) -> Optional[str]:
+        sizes = self.sizes()
+        if not sizes:
+            return None
+        parts = ', '.join(f"{name} {size / 2 ** 20:.1f}MB" for name, size in sizes.items())
+        return f"浏览器缓存目录 {self.root}: {parts}"
@@ -0,0 +1,146 @@
+import random
+import threading
+import time
+from typing import Dict, Optional
+from urllib.parse import urlparse
+
+# 验证码、限流、拒绝访问页面中常见的文字
+BLOCK_MARKERS = (
+    'captcha', 'cf-challenge', 'challenge-platform', 'are you a robot', 'verify you are human',
+    'too many requests', 'rate limit', 'access denied', 'error 429',
+)
+
+
+class BlockedError(Exception):
+    """页面被网站拦截(验证码、限流等)"""
+
+
+def detect_block(html: Optional[str]) -> Optional[str]:
+    """判断页面是否被网站拦截，返回原因；正常页面返回None
+
+    只有公司名称没有游戏行的页面是正常的空公司，不算拦截
+    """
+    if not html:
+        return 'no-content'
+    if '<publisher-app-row' in html:
+        return None
+    lowered = html.lower()
+    for marker in BLOCK_MARKERS:
+        if marker in lowered:
+            return marker
+    if 'publisher-name' not in html:
+        return 'no-app-rows'
+    return None
+
+
+def backoff_delay(attempt: int, base: float, cap: float) -> float:
+    """指数退避加随机抖动：第attempt次(从0开始)等待 [d/2, d]，d = min(cap, base * 2^attempt)"""
+    delay = min(cap, base * 2 ** attempt)
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+class _HostState:
+    def __init__(self, limit: float):
+        self.limit = limit
+        self.in_flight = 0
+        self.next_allowed = 0.0
+        self.failures = 0
+        self.latency: Optional[float] = None
+        self.error_rate = 0.0
+        self.blocks = 0
+        self.requests = 0
+
+
+class AdaptiveLimiter:
+    """按主机自适应调整并发数和请求间隔
+
+    网站正常时每次成功把并发上限加 1/上限(约每轮加1)，直到 max_per_host；
+    出错时上限乘0.75，被拦截时减半，并按连续失败次数指数退避暂停该主机的请求
+    """
+
+    def __init__(self, max_per_host: int = 2, min_interval: float = 1.0, initial_per_host: Optional[int] = None,
+                 base_backoff: float = 5.0, max_backoff: float = 300.0, alpha: float = 0.3):
+        self.max_per_host = max(1, max_per_host)
+        self.min_interval = min_interval
+        self.initial_per_host = min(self.max_per_host, initial_per_host or max(1, self.max_per_host // 2))
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.alpha = alpha
+        self._cond = threading.Condition()
+        self._hosts: Dict[str, _HostState] = {}
+
+    def _state(self, host: str) -> _HostState:
+        if host not in self._hosts:
+            self._hosts[host] = _HostState(float(self.initial_per_host))
+        return self._hosts[host]
+
+    def _take(self, state: _HostState, now: float) -> bool:
+        if state.in_flight >= int(state.limit) or now < state.next_allowed:
+            return False
+        state.in_flight += 1
+        state.next_allowed = now + self.min_interval
+        return True
+
+    def acquire(self, url: str) -> str:
+        """占用一个主机名额，名额已满或主机处于退避期间时等待"""
+        host = urlparse(url).netloc
+        with self._cond:
+            while True:
+                state = self._state(host)
+                now = time.monotonic()
+                if self._take(state, now):
+                    return host
+                if state.in_flight >= int(state.limit):
+                    self._cond.wait()
+                else:
+                    self._cond.wait(state.next_allowed - now)
+
+    def try_acquire(self, url: str) -> Optional[str]:
+        """不等待地占用主机名额，名额已满或间隔未到时返回None"""
+        host = urlparse(url).netloc
+        with self._cond:
+            return host if self._take(self._state(host), time.monotonic()) else None
+
+    def release(self, host: str, outcome: Optional[str] = None, latency: Optional[float] = None) -> None:
+        """释放主机名额；outcome为 ok / error / blocked 时据此调整该主机的并发上限和退避"""
+        with self._cond:
+            state = self._state(host)
+            state.in_flight = max(0, state.in_flight - 1)
+            if outcome is not None:
+                self._feedback(host, state, outcome, latency)
+            self._cond.notify_all()
+
+    def _feedback(self, host: str, state: _HostState, outcome: str, latency: Optional[float]) -> None:
+        state.requests += 1
+        failed = outcome != 'ok'
+        state.error_rate = (1 - self.alpha) * state.error_rate + self.alpha * (1.0 if failed else 0.0)
+        if not failed:
+            slow = latency is not None and state.latency is not None and latency > 3 * state.latency
+            if latency is not None:
+                state.latency = latency if state.latency is None else (1 - self.alpha) * state.latency + self.alpha * latency
+            state.failures = 0
+            if slow:
+                # 延迟突然变高说明网站开始吃力，稍微降低并发
+                state.limit = max(1.0, state.limit * 0.9)
+            else:
+                state.limit = min(float(self.max_per_host), state.limit + 1 / state.limit)
+            return
+
+        if outcome == 'blocked':
+            state.blocks += 1
+        state.limit = max(1.0, state.limit * (0.5 if outcome == 'blocked' else 0.75))
+        delay = backoff_delay(state.failures, self.base_backoff, self.max_backoff)
+        state.failures += 1
+        state.next_allowed = max(state.next_allowed, time.monotonic() + delay)
+        print(f"{host} {'被拦截' if outcome == 'blocked' else '请求失败'}，并发上限降为 {int(state.limit)}，"
+              f"暂停 {delay:.1f}s")
+
+    def stats(self) -> Dict[str, dict]:
+        with self._cond:
+            return {host: {
+                'limit': int(state.limit),
+                'latency': round(state.latency, 3) if state.latency is not None else None,
+                'error_rate': round(state.error_rate, 3),
+                'blocks': state.blocks,
+                'requests': state.requests,
+            } for host, state in self._hosts.items()}
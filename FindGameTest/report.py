@@ -0,0 +1,106 @@
+import glob
+import os
+import re
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+HEADER_ROW = '<tr><th>图标</th><th>游戏名</th><th>发布日期</th><th>国家</th><th>所属公司</th></tr>\n'
+# 整页一次写入，避免每行一次小的磁盘写
+WRITE_BUFFER = 1 << 20
+
+
+def _page_head(title: str) -> str:
+    return (f'<html><head><meta charset="utf-8"><title>{title}</title></head><body>\n'
+            f'<h1>{title}</h1>\n')
+
+
+def iter_rows(games: Iterable[dict]) -> Iterator[str]:
+    """逐行生成表格内容；图标延迟加载，滚动到附近时才请求，没有图标的行不放img"""
+    for game in games:
+        image_url = game.get('image_url', 'N/A')
+        icon = (f"<img src='{image_url}' alt='Game Image' height='32px' width='32px' loading='lazy' decoding='async'>"
+                if image_url and image_url != 'N/A' else '')
+        yield (
+            f"<tr><td>{icon}</td>\n"
+            f"<td><a href='{game['url']}'>{game['name']}</a></td>\n"
+            f"<td>{game['release_date']}</td>\n"
+            f"<td>{game['countries']}</td>\n"
+            f"<td><a href='{game['source_url']}'>{game['company_name']}</a></td></tr>\n"
+        )
+
+
+def _write_table_page(path: str, title: str, games: List[dict], nav: str = '') -> None:
+    with open(path, 'w', encoding='utf-8', buffering=WRITE_BUFFER) as file:
+        file.write(_page_head(title))
+        file.write(nav)
+        file.write('<table border="1">\n')
+        file.write(HEADER_ROW)
+        file.writelines(iter_rows(games))
+        file.write('</table>\n')
+        file.write(nav)
+        file.write('</body></html>\n')
+
+
+def _partition(games: List[dict], page_size: int, split: str) -> List[Tuple[str, List[dict]]]:
+    """按数量或按发布月份拆分，返回 (标签, 游戏列表)；游戏已按日期排好序，同一月份是连续的"""
+    if split == 'month':
+        parts: List[Tuple[str, List[dict]]] = []
+        for game in games:
+            parsed = game.get('parsed_date')
+            label = parsed.strftime('%Y-%m') if parsed else '未知日期'
+            if not parts or parts[-1][0] != label:
+                parts.append((label, []))
+            parts[-1][1].append(game)
+        return parts
+    return [(str(i // page_size + 1), games[i:i + page_size]) for i in range(0, len(games), page_size)]
+
+
+def _date_range(games: List[dict]) -> str:
+    dates = [game['parsed_date'] for game in games if game.get('parsed_date')]
+    if not dates:
+        return ''
+    return f"{max(dates).strftime('%Y-%m-%d')} ~ {min(dates).strftime('%Y-%m-%d')}"
+
+
+def write_report(games: List[dict], output_file: str, page_size: Optional[int] = 2000, split: str = 'page',
+                 title: str = '数据分析') -> List[str]:
+    """生成结果网页，返回写入的文件列表
+
+    按数量分页且游戏数不超过page_size(或page_size为0)时只生成一个网页；否则output_file为目录页，
+    每页(或每个月份)单独一个网页，与output_file放在同一目录，文件名加 _p序号
+    """
+    base, ext = os.path.splitext(output_file)
+    # 删除上次运行留下的分页文件，页数变少时不会留下过期的页面
+    page_pattern = re.compile(re.escape(os.path.basename(base)) + r'_p\d+' + re.escape(ext))
+    for old in glob.glob(glob.escape(base) + '_p*' + ext):
+        if page_pattern.fullmatch(os.path.basename(old)):
+            os.remove(old)
+
+    if split == 'page' and (not page_size or len(games) <= page_size):
+        _write_table_page(output_file, title, games)
+        return [output_file]
+
+    parts = _partition(games, page_size, split)
+    names = [f'{os.path.basename(base)}_p{i + 1}{ext}' for i in range(len(parts))]
+    index_name = os.path.basename(output_file)
+    files = []
+    for i, (label, part) in enumerate(parts):
+        links = [f"<a href='{index_name}'>目录</a>"]
+        if i > 0:
+            links.insert(0, f"<a href='{names[i - 1]}'>上一页</a>")
+        if i < len(parts) - 1:
+            links.append(f"<a href='{names[i + 1]}'>下一页</a>")
+        nav = f"<p>第 {i + 1}/{len(parts)} 页 {' | '.join(links)}</p>\n"
+        path = os.path.join(os.path.dirname(output_file), names[i])
+        _write_table_page(path, f'{title} - {label}', part, nav)
+        files.append(path)
+
+    with open(output_file, 'w', encoding='utf-8', buffering=WRITE_BUFFER) as file:
+        file.write(_page_head(title))
+        file.write(f'<p>共 {len(games)} 个游戏，分为 {len(parts)} 页</p>\n')
+        file.write('<table border="1">\n<tr><th>页</th><th>游戏数</th><th>发布日期</th></tr>\n')
+        file.writelines(
+            f"<tr><td><a href='{name}'>{label}</a></td><td>{len(part)}</td><td>{_date_range(part)}</td></tr>\n"
+            for name, (label, part) in zip(names, parts)
+        )
+        file.write('</table>\n</body></html>\n')
+    return [output_file] + files
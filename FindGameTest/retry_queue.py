@@ -0,0 +1,155 @@
+import heapq
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Iterable, List, NamedTuple, Optional
+
+from metrics import get_metrics
+from rate_limiter import backoff_delay
+
+
+class RetryTask(NamedTuple):
+    index: int
+    url: str
+    attempt: int = 0
+    # 上一次失败时使用的代理，重试时换一个
+    proxy: Optional[str] = None
+
+
+class RetryQueue:
+    """网址任务队列：失败的网址延迟后重新排队，不在原地重试，正常的网址不用等待出错的网址
+
+    到了重试时间的网址优先于新网址取出，与主流程交错进行；重试次数用完的网址放入 dead
+    """
+
+    def __init__(self, urls: Iterable[str], max_retries: int = 3, base_delay: float = 30, max_delay: float = 300):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.dead: List[dict] = []
+        self.retried = 0
+        self._fresh = [RetryTask(index, url) for index, url in enumerate(urls)]
+        self._fresh.reverse()
+        # (可重试时间, 序号, 任务)
+        self._delayed: list = []
+        self._seq = 0
+        self._in_flight = 0
+        self._closed = False
+        self._cond = threading.Condition()
+
+    def _pop_ready(self) -> Optional[RetryTask]:
+        if self._delayed and self._delayed[0][0] <= time.monotonic():
+            return heapq.heappop(self._delayed)[2]
+        if self._fresh:
+            return self._fresh.pop()
+        return None
+
+    def get(self, block: bool = True) -> Optional[RetryTask]:
+        """取出下一个网址；block为False时没有可用网址立即返回None，否则等到有网址或全部完成(返回None)"""
+        with self._cond:
+            while True:
+                task = None if self._closed else self._pop_ready()
+                if task is not None:
+                    self._in_flight += 1
+                    return task
+                if not block or self._closed or not (self._delayed or self._in_flight):
+                    return None
+                timeout = self._delayed[0][0] - time.monotonic() if self._delayed else None
+                self._cond.wait(timeout)
+
+    def wait(self) -> bool:
+        """等到有可取出的网址时返回True，全部完成时返回False"""
+        with self._cond:
+            while True:
+                if self._closed:
+                    return False
+                if self._fresh or (self._delayed and self._delayed[0][0] <= time.monotonic()):
+                    return True
+                if not (self._delayed or self._in_flight):
+                    return False
+                timeout = self._delayed[0][0] - time.monotonic() if self._delayed else None
+                self._cond.wait(timeout)
+
+    def done(self, task: RetryTask, success: bool, proxy: Optional[str] = None, reason: str = 'error') -> None:
+        """报告一个网址的结果，失败时按指数退避重新排队或放入 dead"""
+        metrics = get_metrics()
+        # 抓取函数不在原地重试，重试次数以队列中的为准
+        metrics.record_page(task.url, retries=task.attempt)
+        with self._cond:
+            self._in_flight -= 1
+            if not success:
+                if task.attempt < self.max_retries:
+                    delay = backoff_delay(task.attempt, self.base_delay, self.max_delay)
+                    heapq.heappush(self._delayed, (time.monotonic() + delay, self._seq,
+                                                   task._replace(attempt=task.attempt + 1, proxy=proxy)))
+                    self._seq += 1
+                    self.retried += 1
+                    metrics.count('retry')
+                    print(f"{task.url} 失败({reason})，{delay:.0f}s 后第 {task.attempt + 1} 次重试")
+                else:
+                    print(f"{task.url} 重试 {task.attempt} 次后仍失败({reason})，记录到失败列表")
+                    self._dead(task, reason)
+            self._cond.notify_all()
+
+    def requeue(self, task: RetryTask) -> None:
+        """没有真正请求网站的网址(如浏览器被占用)放回队列优先取出，不计入重试次数"""
+        with self._cond:
+            self._in_flight -= 1
+            heapq.heappush(self._delayed, (time.monotonic(), self._seq, task))
+            self._seq += 1
+            self._cond.notify_all()
+
+    def _dead(self, task: RetryTask, reason: str) -> None:
+        self.dead.append({'url': task.url, 'attempts': task.attempt + 1, 'reason': reason,
+                          'time': datetime.now().isoformat(timespec='seconds')})
+
+    def close(self) -> None:
+        """停止分配网址(如所有浏览器都已退出)，还没完成的网址放入 dead"""
+        with self._cond:
+            self._closed = True
+            for task in reversed(self._fresh):
+                self._dead(task, 'not-run')
+            for _, _, task in sorted(self._delayed):
+                self._dead(task, 'not-run')
+            self._fresh, self._delayed = [], []
+            self._cond.notify_all()
+
+
+class DeadLetterFile:
+    """重试次数用完的网址，每行一个JSON；下次运行可以用它重新抓取"""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def load(self) -> Dict[str, dict]:
+        records: Dict[str, dict] = {}
+        if not os.path.exists(self.path):
+            return records
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                records[record['url']] = record
+        return records
+
+    def update(self, succeeded: Iterable[str], failed: List[dict]) -> int:
+        """去掉这次成功的网址，加入这次失败的网址，返回剩余数量；为空时删除文件"""
+        records = self.load()
+        for url in succeeded:
+            records.pop(url, None)
+        for record in failed:
+            records[record['url']] = record
+        if not records:
+            if os.path.exists(self.path):
+                os.remove(self.path)
+            return 0
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            for record in records.values():
+                f.write(json.dumps(record, ensure_ascii=False) + '\n')
+        os.replace(tmp_path, self.path)
+        return len(records)
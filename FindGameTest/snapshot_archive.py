@@ -0,0 +1,166 @@
+import gzip
+import hashlib
+import json
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+try:
+    import zstandard
+except ImportError:  # zstandard为可选依赖，没有安装时用gzip压缩
+    zstandard = None
+
+CODECS = ('zst', 'gz')
+
+
+def zstd_available() -> bool:
+    return zstandard is not None
+
+
+def _compress(data: bytes, codec: str) -> bytes:
+    if codec == 'zst':
+        return zstandard.ZstdCompressor(level=10).compress(data)
+    return gzip.compress(data, compresslevel=6)
+
+
+def _decompress(data: bytes, codec: str) -> bytes:
+    if codec == 'zst':
+        if zstandard is None:
+            raise RuntimeError("未安装zstandard，无法读取.zst快照")
+        return zstandard.ZstdDecompressor().decompress(data)
+    return gzip.decompress(data)
+
+
+class SnapshotArchive:
+    """按内容寻址的页面快照：每个页面压缩后以内容的sha256命名，相同内容只保存一份
+
+    index.jsonl 每次抓取追加一行(网址、时间、本次运行的编号、内容哈希)，页面结构变化后可以离线重新解析历史页面
+    """
+
+    def __init__(self, root: str, codec: str = 'auto'):
+        self.root = root
+        if codec == 'auto':
+            codec = 'zst' if zstandard is not None else 'gz'
+        if codec == 'zst' and zstandard is None:
+            print("未安装zstandard，快照使用gzip压缩")
+            codec = 'gz'
+        self.codec = codec
+        self.index_path = os.path.join(root, 'index.jsonl')
+        # 运行编号为开始时间，回放时可以选择某一次运行保存的页面
+        self.run = datetime.now().isoformat(timespec='seconds')
+        self.saved = 0
+        self.deduplicated = 0
+        self._lock = threading.Lock()
+
+    def _object_path(self, sha: str, codec: str) -> str:
+        return os.path.join(self.root, 'objects', sha[:2], f'{sha}.{codec}')
+
+    def _find(self, sha: str) -> Optional[Tuple[str, str]]:
+        for codec in CODECS:
+            path = self._object_path(sha, codec)
+            if os.path.exists(path):
+                return path, codec
+        return None
+
+    def save(self, url: str, content: str, kind: str = 'html') -> str:
+        """保存一个页面，返回内容哈希；kind为html(页面源码)或js(页面内提取的JSON)"""
+        data = content.encode('utf-8')
+        sha = hashlib.sha256(data).hexdigest()
+        found = self._find(sha)
+        if found is None:
+            path = self._object_path(sha, self.codec)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # 先写临时文件再改名，多个线程保存相同内容时不会读到写了一半的文件
+            tmp_path = f'{path}.{threading.get_ident()}.tmp'
+            with open(tmp_path, 'wb') as f:
+                f.write(_compress(data, self.codec))
+            os.replace(tmp_path, path)
+            codec = self.codec
+        else:
+            codec = found[1]
+        entry = {'url': url, 'time': datetime.now().isoformat(timespec='seconds'), 'run': self.run, 'sha': sha,
+                 'codec': codec, 'kind': kind, 'bytes': len(data)}
+        with self._lock:
+            if found is None:
+                self.saved += 1
+            else:
+                self.deduplicated += 1
+            os.makedirs(self.root, exist_ok=True)
+            with open(self.index_path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+        return sha
+
+    def load(self, sha: str) -> str:
+        found = self._find(sha)
+        if found is None:
+            raise FileNotFoundError(f"快照不存在: {sha}")
+        path, codec = found
+        with open(path, 'rb') as f:
+            return _decompress(f.read(), codec).decode('utf-8')
+
+    def entries(self) -> Iterator[dict]:
+        """按抓取顺序返回索引记录，忽略没写完整的行"""
+        if not os.path.exists(self.index_path):
+            return
+        with open(self.index_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    continue
+
+    def runs(self) -> Dict[str, int]:
+        """保存过快照的每次运行及其页面数，按时间排列；没有运行编号的旧记录不计入"""
+        runs: Dict[str, int] = {}
+        for entry in self.entries():
+            if entry.get('run'):
+                runs[entry['run']] = runs.get(entry['run'], 0) + 1
+        return runs
+
+    def latest(self, since: Optional[str] = None, urls: Optional[List[str]] = None,
+               run: Optional[str] = None) -> List[dict]:
+        """每个网址最新的一次快照，按urls的顺序或快照时间排列
+
+        since为 YYYY-MM-DD 时只看这天之后的快照；run 为运行编号时只看这次运行保存的快照
+        """
+        latest: Dict[str, dict] = {}
+        for entry in self.entries():
+            if since and entry['time'] < since:
+                continue
+            if run and entry.get('run') != run:
+                continue
+            if entry['url'] in latest:
+                del latest[entry['url']]
+            latest[entry['url']] = entry
+        if urls is not None:
+            return [latest[url] for url in urls if url in latest]
+        return list(latest.values())
+
+    def summary(self) -> str:
+        return f"页面快照: 新保存 {self.saved} 个，内容相同未重复保存 {self.deduplicated} 个 ({self.root})"
+
+
+def _replay_one(task) -> List[dict]:
+    root, entry, parse = task
+    try:
+        return parse(SnapshotArchive(root).load(entry['sha']), entry['url'])
+    except Exception as e:
+        print(f"解析快照 {entry['url']} ({entry['sha'][:12]}) 出错: {e}")
+        return []
+
+
+def replay(archive: SnapshotArchive, entries: List[dict],
+           parsers: Dict[str, Callable[[str, str], List[dict]]], workers: int = 0) -> List[Tuple[str, List[dict]]]:
+    """不启动浏览器，用多个进程重新解析快照，按entries的顺序返回 (网址, 游戏列表)
+
+    parsers 按快照的kind选择解析函数，需要能被子进程导入(模块级函数或functools.partial)
+    """
+    tasks = [(archive.root, entry, parsers[entry.get('kind', 'html')]) for entry in entries]
+    if workers == 1 or len(tasks) < 2:
+        games = [_replay_one(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers or None) as executor:
+            games = list(executor.map(_replay_one, tasks, chunksize=4))
+    return [(entry['url'], found) for entry, found in zip(entries, games)]
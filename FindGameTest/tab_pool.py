@@ -0,0 +1,194 @@
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from metrics import get_metrics
+from page_ready import APP_ROW_SELECTOR
+from rate_limiter import detect_block
+
+# 返回页面加载状态、游戏行数量和JS堆内存；stale表示新页面还没替换掉上一个页面
+_STATE_SCRIPT = '''
+var heap = window.performance && performance.memory ? performance.memory.usedJSHeapSize : 0;
+return {
+    stale: window.__findGameLeaving === true,
+    ready: document.readyState,
+    name: !!document.querySelector('.publisher-name'),
+    rows: document.querySelectorAll(arguments[0]).length,
+    heap: heap
+};
+'''
+
+# 让后台标签页也能正常渲染，不被Chrome降速
+BACKGROUND_TAB_ARGS = (
+    '--disable-background-timer-throttling',
+    '--disable-backgrounding-occluded-windows',
+    '--disable-renderer-backgrounding',
+)
+
+
+class _Tab:
+    def __init__(self, handle: str):
+        self.handle = handle
+        self.task: Optional[Tuple[int, str]] = None
+        self.host: Optional[str] = None
+        self.started = 0.0
+        self.last_rows = -1
+        self.stable_since = 0.0
+        # 第一次看到公司名称且没有游戏行的时间
+        self.name_since: Optional[float] = None
+
+
+class TabPool:
+    def __init__(self, session, tabs: int = 4, limiter=None, timeout: float = 30, settle: float = 0.8,
+                 empty_grace: float = 5.0, prepare_tab: Optional[Callable[[object], None]] = None,
+                 harvest: Optional[Callable[[object], str]] = None):
+        self.session = session
+        self.tabs = max(1, tabs)
+        self.limiter = limiter
+        self.timeout = timeout
+        self.settle = settle
+        # 只有公司名称没有游戏行超过这个时间视为空公司，与 wait_for_app_rows 的 empty 相同
+        self.empty_grace = empty_grace
+        self.prepare_tab = prepare_tab
+        # 页面就绪后取回的内容，默认为整个页面源码
+        self.harvest = harvest or (lambda driver: driver.page_source)
+        # 每个标签页的JS堆内存(字节)
+        self.heap_samples: Dict[str, List[int]] = {}
+        # 因主机名额已满暂时没能分配出去的网址
+        self._pending: Optional[Tuple[int, str]] = None
+        # 已打开的标签页，多次调用run时复用，浏览器出错后重新打开
+        self._tabs: Optional[List[_Tab]] = None
+
+    def _open_tabs(self, driver) -> List[_Tab]:
+        handles = [driver.current_window_handle]
+        for _ in range(self.tabs - 1):
+            driver.switch_to.new_window('tab')
+            if self.prepare_tab:
+                self.prepare_tab(driver)
+            handles.append(driver.current_window_handle)
+        return [_Tab(handle) for handle in handles]
+
+    def _assign(self, driver, tab: _Tab, next_task: Callable[[], Optional[Tuple[int, str]]]) -> bool:
+        """给空闲标签页分配下一个网址，没有可用网址时返回False"""
+        task = next_task()
+        if task is None:
+            return False
+        host = None
+        if self.limiter is not None:
+            host = self.limiter.try_acquire(task[1])
+            if host is None:
+                # 同一主机的名额已满，稍后再试
+                self._pending = task
+                return False
+        driver.switch_to.window(tab.handle)
+        # 用脚本跳转，不等待页面加载完成，多个标签页可以同时加载
+        driver.execute_script('window.__findGameLeaving = true; window.location.href = arguments[0]', task[1])
+        print(f"[tab {tab.handle[-6:]}] 正在访问: {task[1]}")
+        tab.task, tab.host = task, host
+        tab.started = tab.stable_since = time.monotonic()
+        tab.last_rows = -1
+        tab.name_since = None
+        return True
+
+    def _finish(self, tab: _Tab, outcome: Optional[str] = None) -> None:
+        if self.limiter is not None and tab.host is not None:
+            self.limiter.release(tab.host, outcome, time.monotonic() - tab.started)
+        tab.task = tab.host = None
+
+    def run(self, next_task: Callable[[], Optional[Tuple[int, str]]],
+            on_page: Callable[[int, str, str], None],
+            on_failure: Callable[[int, str], None]) -> None:
+        """不断给空闲标签页分配网址，哪个标签页先加载完成就先取回页面
+
+        浏览器出错时，正在加载的网址都交给on_failure，然后抛出异常由调用方重启浏览器
+        """
+        self._pending = None
+
+        def take_task():
+            task, self._pending = self._pending, None
+            return task or next_task()
+
+        driver = self.session.driver
+        if driver is None:
+            raise RuntimeError("浏览器启动失败")
+        if self._tabs is None:
+            self._tabs = self._open_tabs(driver)
+        tabs = self._tabs
+        try:
+            self._loop(driver, tabs, take_task, on_page, on_failure)
+        except Exception:
+            self._tabs = None
+            for tab in tabs:
+                if tab.task is not None:
+                    on_failure(*tab.task)
+                    self._finish(tab)
+            if self._pending is not None:
+                on_failure(*self._pending)
+                self._pending = None
+            raise
+
+    def _loop(self, driver, tabs: List[_Tab], take_task, on_page, on_failure) -> None:
+        exhausted = False
+        while True:
+            if not exhausted:
+                for tab in tabs:
+                    if tab.task is None and not self._assign(driver, tab, take_task):
+                        exhausted = self._pending is None
+                        break
+            busy = [tab for tab in tabs if tab.task is not None]
+            if not busy:
+                if exhausted:
+                    return
+                time.sleep(0.1)
+                continue
+
+            for tab in busy:
+                index, url = tab.task
+                driver.switch_to.window(tab.handle)
+                state = driver.execute_script(_STATE_SCRIPT, APP_ROW_SELECTOR)
+                now = time.monotonic()
+                if state['stale']:
+                    state['rows'] = -1
+                if state['rows'] != tab.last_rows:
+                    tab.last_rows, tab.stable_since = state['rows'], now
+                ready = state['rows'] > 0 and now - tab.stable_since >= self.settle
+                if state['rows'] == 0 and state['name']:
+                    if tab.name_since is None:
+                        tab.name_since = now
+                    empty = now - tab.name_since >= self.empty_grace
+                else:
+                    tab.name_since, empty = None, False
+                if not ready and not empty and now - tab.started < self.timeout:
+                    continue
+
+                if state['heap']:
+                    self.heap_samples.setdefault(tab.handle, []).append(state['heap'])
+                metrics = get_metrics()
+                metrics.observe('tab_load', now - tab.started, url)
+                if ready or empty:
+                    if empty:
+                        print(f"[tab {tab.handle[-6:]}] 公司没有游戏: {url}")
+                    print(f"[tab {tab.handle[-6:]}] 页面就绪用时: {now - tab.started:.1f}s")
+                    self.session.report(True, now - tab.started)
+                    with metrics.stage('page_source', url):
+                        page_source = self.harvest(driver)
+                    metrics.record_page(url, status='ok', proxy=self.session.proxy, page_bytes=len(page_source),
+                                        app_rows=state['rows'], ready_state='empty' if empty else 'ready')
+                    # 先释放标签页再交出页面，之后出错时这个网址不会再被报告为失败
+                    self._finish(tab, 'ok')
+                    on_page(index, url, page_source)
+                else:
+                    blocked = detect_block(driver.page_source) is not None
+                    self.session.report(False, blocked=blocked)
+                    metrics.record_page(url, status='failed', proxy=self.session.proxy, app_rows=state['rows'])
+                    # 只有公司名称没有游戏行是正常的空公司，不需要退避
+                    self._finish(tab, 'blocked' if blocked else ('ok' if state['name'] else 'error'))
+                    on_failure(index, url)
+            time.sleep(0.1)
+
+    def memory_report(self) -> str:
+        """每个标签页的平均/最大JS堆内存"""
+        lines = []
+        for handle, samples in self.heap_samples.items():
+            lines.append(f"tab {handle[-6:]}: 平均 {sum(samples) / len(samples) / 2 ** 20:.1f}MB, "
+                         f"最大 {max(samples) / 2 ** 20:.1f}MB, 页面数 {len(samples)}")
+        return '\n'.join(lines)